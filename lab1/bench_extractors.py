@@ -0,0 +1,71 @@
+import os
+import sys
+import time
+from ex1 import fetch_html
+from extractors import EXTRACTORS
+
+# Usage: python bench_extractors.py [listing.html product.html] [repeat]
+# Without page paths the front page and its first product page are downloaded into saved_pages/ once.
+SAVED_PAGES_DIR = "saved_pages"
+LISTING_URL = "http://books.toscrape.com/"
+
+
+def load_saved_pages():
+    listing_path = os.path.join(SAVED_PAGES_DIR, "listing.html")
+    product_path = os.path.join(SAVED_PAGES_DIR, "product.html")
+    if not os.path.exists(listing_path) or not os.path.exists(product_path):
+        os.makedirs(SAVED_PAGES_DIR, exist_ok=True)
+        listing_html, status = fetch_html(LISTING_URL)
+        if not listing_html:
+            sys.exit(f"Could not download the listing page: {status}")
+        first_link = EXTRACTORS["soup"]().extract_books(listing_html)[0]['link']
+        product_html, status = fetch_html(LISTING_URL + first_link)
+        if not product_html:
+            sys.exit(f"Could not download the product page: {status}")
+        with open(listing_path, "w", encoding="utf-8") as f:
+            f.write(listing_html)
+        with open(product_path, "w", encoding="utf-8") as f:
+            f.write(product_html)
+    return listing_path, product_path
+
+
+def read(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def timed(function, html_content, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = function(html_content)
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+
+def main():
+    args = sys.argv[1:]
+    repeat = int(args.pop()) if args and args[-1].isdigit() else 50
+    listing_path, product_path = args if len(args) == 2 else load_saved_pages()
+    listing_html = read(listing_path)
+    product_html = read(product_path)
+
+    baseline = None
+    print(f"{'extractor':<12}{'listing ms':>12}{'product ms':>12}{'speedup':>10}")
+    for name, extractor_class in EXTRACTORS.items():
+        try:
+            extractor = extractor_class()
+        except ImportError as e:
+            print(f"{name:<12} skipped: {e}")
+            continue
+
+        listing_ms, books = timed(extractor.extract_books, listing_html, repeat)
+        product_ms, details = timed(extractor.extract_product_details, product_html, repeat)
+        if baseline is None:
+            baseline = (listing_ms + product_ms, books, details)
+        elif (books, details) != baseline[1:]:
+            print(f"{name:<12} WARNING: output differs from {next(iter(EXTRACTORS))}")
+        speedup = baseline[0] / (listing_ms + product_ms)
+        print(f"{name:<12}{listing_ms:>12.3f}{product_ms:>12.3f}{speedup:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+import random
+import sys
+import time
+from ex5 import convert_gbp_to_mdl, filter_books_by_price, sum_of_filtered_prices
+from price_index import BookColumns
+
+# Usage: python bench_price_index.py [number_of_books] [number_of_queries]
+
+
+def make_books(count):
+    random.seed(42)
+    return [{'name': f"Book {i}", 'price': round(random.uniform(10, 60), 2), 'link': f"book-{i}"} for i in range(count)]
+
+
+def make_ranges(count):
+    ranges = []
+    for _ in range(count):
+        low = random.uniform(200, 1300)
+        ranges.append((low, low + random.uniform(10, 200)))
+    return ranges
+
+
+def run_lists(books_info, ranges):
+    # The current ex5 pipeline: map + filter(lambda) + reduce for every query
+    results = []
+    for min_price, max_price in ranges:
+        converted_books = convert_gbp_to_mdl(dict(book) for book in books_info)
+        filtered_books = list(filter_books_by_price(converted_books, min_price, max_price))
+        results.append((len(filtered_books), sum_of_filtered_prices(filtered_books)))
+    return results
+
+
+def run_columnar(columns, ranges):
+    results = []
+    for min_price, max_price in ranges:
+        results.append((len(columns.range_indices(min_price, max_price)), columns.range_sum(min_price, max_price)))
+    return results
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    book_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    query_count = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    books_info = make_books(book_count)
+    ranges = make_ranges(query_count)
+
+    lists_time, expected = timed(run_lists, books_info, ranges)
+    build_time, columns = timed(BookColumns, books_info)
+    query_time, actual = timed(run_columnar, columns, ranges)
+    batch_time, (counts, sums) = timed(columns.batch_query, ranges)
+
+    for (expected_count, expected_sum), (count, total), batch_count, batch_sum in zip(expected, actual, counts, sums):
+        assert expected_count == count == batch_count
+        assert abs(expected_sum - total) < 1e-6 * max(1.0, expected_sum)
+        assert abs(expected_sum - batch_sum) < 1e-6 * max(1.0, expected_sum)
+
+    print(f"{book_count} books, {query_count} range queries")
+    print(f"list/lambda pipeline : {lists_time * 1000:10.2f} ms")
+    print(f"columnar build       : {build_time * 1000:10.2f} ms")
+    print(f"columnar queries     : {query_time * 1000:10.2f} ms")
+    print(f"columnar batch query : {batch_time * 1000:10.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
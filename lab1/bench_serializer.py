@@ -0,0 +1,135 @@
+import io
+import re
+import sys
+import time
+from ex8 import CustomSerializer, SerializerWriter
+
+# Usage: python bench_serializer.py [number_of_books] [nesting_depth]
+
+
+def legacy_serialize(obj):
+    # The previous serializer: an f-string list joined at every nesting level
+    if isinstance(obj, dict):
+        items = [f"{key}:{legacy_serialize(value)}" for key, value in obj.items()]
+        return "{" + ";".join(items) + "}"
+    elif isinstance(obj, list):
+        return "[" + ",".join([legacy_serialize(item) for item in obj]) + "]"
+    elif isinstance(obj, str):
+        return "s:" + re.sub(r"([{};:,])", r"\\\1", obj)
+    elif isinstance(obj, bool):
+        return f"b:{obj}"
+    elif isinstance(obj, int):
+        return f"i:{obj}"
+    return f"f:{obj}"
+
+
+def legacy_split_items(serialized_str, delimiter, maxsplit=-1):
+    result = []
+    current = []
+    escaped = False
+    depth = 0
+
+    for char in serialized_str:
+        if escaped:
+            current.append(char)
+            escaped = False
+        elif char == "\\":
+            escaped = True
+        elif char in "{[":
+            depth += 1
+            current.append(char)
+        elif char in "}]":
+            depth -= 1
+            current.append(char)
+        elif char == delimiter and depth == 0:
+            result.append("".join(current))
+            current = []
+        else:
+            current.append(char)
+
+    result.append("".join(current))
+    if maxsplit != -1:
+        return result[:maxsplit] + [delimiter.join(result[maxsplit:])]
+    return result
+
+
+def legacy_deserialize(serialized_str):
+    # The previous recursive implementation, kept here as the baseline
+    if serialized_str.startswith("{") and serialized_str.endswith("}"):
+        items = legacy_split_items(serialized_str[1:-1], ";")
+        obj = {}
+        for item in items:
+            key, value = legacy_split_items(item, ":", 1)
+            obj[key] = legacy_deserialize(value)
+        return obj
+    elif serialized_str.startswith("[") and serialized_str.endswith("]"):
+        items = legacy_split_items(serialized_str[1:-1], ",")
+        return [legacy_deserialize(item) for item in items]
+    elif serialized_str.startswith("s:"):
+        return re.sub(r"\\([{};:,])", r"\1", serialized_str[2:])
+    elif serialized_str.startswith("i:"):
+        return int(serialized_str[2:])
+    elif serialized_str.startswith("f:"):
+        return float(serialized_str[2:])
+    elif serialized_str.startswith("b:"):
+        return serialized_str[2:] == "True"
+    else:
+        raise ValueError(f"Cannot deserialize string: {serialized_str}")
+
+
+def make_book(i, depth):
+    book = {
+        # No escaped characters: the legacy parser loses escapes below the top level
+        "name": f"Book {i} A Story of Many Pages",
+        "price": 10 + i * 0.01,
+        "link": f"http://books.toscrape.com/catalogue/book_{i}/index.html",
+        "UPC": f"{i:016x}",
+        "Availability": f"In stock ({i % 20} available)",
+        "Number of reviews": i % 5,
+        "on_sale": i % 2 == 0,
+        "ratings": [i % 5, (i + 1) % 5, (i + 2) % 5],
+    }
+    nested = book
+    for level in range(depth):
+        nested["details"] = {"level": level, "tags": ["fiction", "classics"], "note": "nested level"}
+        nested = nested["details"]
+    return book
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    book_count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    depth = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    books = [make_book(i, depth) for i in range(book_count)]
+    dump = CustomSerializer.serialize(books)
+    print(f"{book_count} books, nesting depth {depth}, {len(dump) / 1024 / 1024:.1f} MB serialized")
+
+    legacy_time, legacy_result = timed(legacy_deserialize, dump)
+    new_time, new_result = timed(CustomSerializer.deserialize, dump)
+    assert new_result == legacy_result == books
+
+    legacy_write_time, legacy_bytes = timed(lambda: "".join(legacy_serialize(book) for book in books).encode())
+    writer = SerializerWriter()
+    writer.write_many(books)  # warm up the reusable buffer
+    writer_time, written = timed(lambda: writer.reset().write_many(books).getvalue())
+    assert written == legacy_bytes
+
+    # Incremental mode: the same books written one after another and read back in 64 KB chunks
+    stream = "".join(CustomSerializer.serialize(book) for book in books).encode()
+    stream_time, streamed = timed(lambda: list(CustomSerializer.iter_deserialize(io.BytesIO(stream))))
+    assert streamed == books
+
+    print(f"legacy deserialize      : {legacy_time * 1000:10.1f} ms")
+    print(f"single-pass deserialize : {new_time * 1000:10.1f} ms ({legacy_time / new_time:.1f}x)")
+    print(f"incremental from stream : {stream_time * 1000:10.1f} ms")
+    print(f"legacy serialize        : {legacy_write_time * 1000:10.1f} ms")
+    print(f"buffer writer           : {writer_time * 1000:10.1f} ms ({legacy_write_time / writer_time:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
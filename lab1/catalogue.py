@@ -0,0 +1,36 @@
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin
+from ex1 import fetch_html
+from extractors import extractor
+from prices import clean_books
+
+CATALOGUE_URL = "http://books.toscrape.com/"
+
+def iter_catalogue_pages(url=CATALOGUE_URL, fetch=fetch_html):
+    # Yield (page_url, books) for every listing page by following the "next" links, books as extracted
+    # (raw price, relative link). Each page is parsed once for both its books and its next link.
+    # The next page is downloaded in the background while the caller works on the current one.
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        pending = executor.submit(fetch, url)
+        while pending:
+            html_content, status = pending.result()
+            if not html_content or status != "Success":
+                print(f"Failed to fetch {url}: {status}")
+                return
+
+            page_url = url
+            books, next_link = extractor.extract_listing(html_content)
+            if next_link:
+                url = urljoin(page_url, next_link)
+                pending = executor.submit(fetch, url)
+            else:
+                pending = None
+
+            yield page_url, books
+
+def iter_books(url=CATALOGUE_URL, fetch=fetch_html):
+    # Stream cleaned book records page by page, only one listing page is kept in memory
+    for page_url, books in iter_catalogue_pages(url, fetch):
+        for book in clean_books(books):
+            book['link'] = urljoin(page_url, book['link'])
+            yield book
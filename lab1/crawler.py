@@ -0,0 +1,41 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+# Default crawl settings, can be overridden per call
+MAX_WORKERS = 8
+REQUESTS_PER_SECOND = 10
+
+
+class HostRateLimiter:
+    def __init__(self, requests_per_second=REQUESTS_PER_SECOND):
+        # Minimum delay between two requests to the same host (0 disables the limit)
+        self.interval = 1.0 / requests_per_second if requests_per_second else 0
+        self.lock = threading.Lock()
+        self.next_slot = {}
+
+    def wait(self, url):
+        if not self.interval:
+            return
+        host = urlparse(url).netloc
+        # Reserve the next free slot for this host, then sleep outside the lock
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot.get(host, now))
+            self.next_slot[host] = slot + self.interval
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+def crawl(urls, fetch, max_workers=MAX_WORKERS, requests_per_second=REQUESTS_PER_SECOND):
+    # Fetch every url with a bounded pool of workers, results keep the order of urls
+    limiter = HostRateLimiter(requests_per_second)
+
+    def limited_fetch(url):
+        limiter.wait(url)
+        return fetch(url)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(limited_fetch, urls))
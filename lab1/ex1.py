@@ -1,10 +1,26 @@
+import os
 import requests
+from http_cache import HTTPCache
+
+# Off by default. With HTTP_CACHE=1 responses are cached in HTTP_CACHE_DIR (.http_cache) for HTTP_CACHE_TTL
+# seconds (300) and revalidated with ETag / Last-Modified after that, so pages can be that stale
+cache = HTTPCache() if os.getenv("HTTP_CACHE", "0") == "1" else None
 
 def fetch_html(url):
+    entry, fresh = cache.lookup(url) if cache else (None, False)
+    if fresh:
+        return entry["body"], "Success"
+
     try:
-        response = requests.get(url)
-        if response.status_code == 200:
+        headers = cache.validation_headers(entry) if entry else {}
+        response = requests.get(url, headers=headers)
+        if response.status_code == 304 and entry:
+            cache.mark_revalidated(url, entry)
+            return entry["body"], "Success"
+        elif response.status_code == 200:
             html_content = response.text
+            if cache:
+                cache.store(url, html_content, response.headers.get("ETag"), response.headers.get("Last-Modified"))
             return html_content, "Success"
         else:
             return None, f"Request failed with status code: {response.status_code}"
@@ -1,14 +1,10 @@
-from bs4 import BeautifulSoup
-import re
+import sys
+from catalogue import iter_books
+from extractors import extractor
+from prices import clean_books
 from ex6 import retrieve_page_body
 from ex1 import fetch_html
 
-def clean_book_data(book_data):
-    book_data['name'] = book_data['name'].strip()
-    price_str = re.sub(r'[^\d.]', '', book_data['price'])
-    book_data['price'] = float(price_str)
-    return book_data
-
 def get_books_info():
     host = "books.toscrape.com"
     port = 80
@@ -17,24 +13,9 @@ def get_books_info():
     # html_content, status= fetch_html("https://books.toscrape.com/")
 
     if html_content:
-        soup = BeautifulSoup(html_content, 'html.parser')
-        books = soup.find_all('article', class_='product_pod')
-        books_info = []
-
-        for book in books:
-            name = book.h3.a['title']
-            price = book.find('p', class_='price_color').text
-            product_link = book.h3.a['href']
-            full_product_link = f"http://{host}/{product_link}"
-
-            book_data = {
-                'name': name,
-                'price': price,
-                'link': full_product_link
-            }
-
-            cleaned_book_data = clean_book_data(book_data)
-            books_info.append(cleaned_book_data)
+        books_info = clean_books(extractor.extract_books(html_content))
+        for book in books_info:
+            book['link'] = f"http://{host}/{book['link']}"
 
         return books_info
     else:
@@ -49,5 +30,7 @@ def display_books_info(books_info):
         print(f"Name: {name}\nPrice: {price}\nLink: {link}\n")
         print("=" * 60)
 
-book_info = get_books_info()
-display_books_info(book_info)
+if __name__ == "__main__":
+    # --all-pages streams every catalogue page instead of only the front page
+    book_info = iter_books() if '--all-pages' in sys.argv else get_books_info()
+    display_books_info(book_info)
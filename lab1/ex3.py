@@ -1,10 +1,13 @@
-import re
 from ex1 import fetch_html
-from ex8 import CustomSerializer
-from bs4 import BeautifulSoup
-import requests
+from ex8 import SerializerWriter
+from catalogue import iter_books
+from crawler import crawl, MAX_WORKERS, REQUESTS_PER_SECOND
+from extractors import extractor
+from prices import clean_books, clean_price
+from uploader import BatchUploader, iter_batches
 import base64
 import json
+import sys
 
 # Server URL
 upload_url = "http://localhost:8000/upload"
@@ -20,27 +23,10 @@ auth_header = {
     "Authorization": f"Basic {encoded_credentials}"
 }
 
-def clean_price(price_str):
-    cleaned_price = re.sub(r'[^\d.]', '', price_str)
-    return float(cleaned_price)
-
-def clean_book_data(book_data):
-    book_data['name'] = book_data['name'].strip()
-    book_data['price'] = clean_price(book_data['price'])
-    return book_data
-
 def get_product_details(product_url):
     product_html, status = fetch_html(product_url)
     if product_html and status == "Success":
-        soup = BeautifulSoup(product_html, 'html.parser')
-        product_table = soup.find('table', class_='table table-striped')
-        product_details = {}
-        if product_table:
-            rows = product_table.find_all('tr')
-            for row in rows:
-                th = row.find('th').text.strip()
-                td = row.find('td').text.strip()
-                product_details[th] = td
+        product_details = extractor.extract_product_details(product_html)
         if 'Price (excl. tax)' in product_details:
             product_details['Price (excl. tax)'] = clean_price(product_details['Price (excl. tax)'])
         if 'Price (incl. tax)' in product_details:
@@ -51,35 +37,39 @@ def get_product_details(product_url):
     else:
         return {}
 
-def get_books_info():
-    url = "http://books.toscrape.com/"
+def get_books_info(url="http://books.toscrape.com/", max_workers=MAX_WORKERS, requests_per_second=REQUESTS_PER_SECOND,
+                   all_pages=False):
+    if all_pages:
+        # Every catalogue page, streamed: details are crawled and books uploaded one batch at a time,
+        # so only the batch in flight is in memory and there is no list to return
+        send_data_to_server(iter_detailed_books(iter_books(url), max_workers, requests_per_second))
+        return None
+
     html_content, status = fetch_html(url)
-    all_serialized_books = []
 
     if html_content and status == "Success":
-        soup = BeautifulSoup(html_content, 'html.parser')
-        books = soup.find_all('article', class_='product_pod')
-        for book in books:
-            name = book.h3.a['title']
-            price = book.find('p', class_='price_color').text
-            product_link = book.h3.a['href']
-            full_product_link = url + product_link
-            book_data = {
-                'name': name,
-                'price': price,
-                'link': full_product_link
-            }
-            cleaned_book_data = clean_book_data(book_data)
-            product_details = get_product_details(cleaned_book_data['link'])
-            cleaned_book_data.update(product_details)
-            serialized_data = CustomSerializer.serialize(cleaned_book_data)
-            all_serialized_books.append(serialized_data)
-            deserialized_data = CustomSerializer.deserialize(serialized_data)
-            display_book_info(deserialized_data)
-            print("=" * 60)
-        send_data_to_server(all_serialized_books)
+        books_info = clean_books(extractor.extract_books(html_content))
+        for book in books_info:
+            book['link'] = url + book['link']
+
+        books_info = list(iter_detailed_books(books_info, max_workers, requests_per_second))
+        send_data_to_server(books_info)
+        return books_info
     else:
         print(f"Failed to fetch the website content: {status}")
+        return []
+
+def iter_detailed_books(books_info, max_workers=MAX_WORKERS, requests_per_second=REQUESTS_PER_SECOND):
+    # Fetch the product pages of one upload batch concurrently, details come back in the same order as the batch
+    for batch in iter_batches(books_info, uploader.batch_size):
+        all_product_details = crawl([book['link'] for book in batch], get_product_details,
+                                    max_workers=max_workers, requests_per_second=requests_per_second)
+
+        for cleaned_book_data, product_details in zip(batch, all_product_details):
+            cleaned_book_data.update(product_details)
+            display_book_info(cleaned_book_data)
+            print("=" * 60)
+            yield cleaned_book_data
 
 def display_book_info(book):
     print(f"Name: {book['name']}")
@@ -100,27 +90,26 @@ def display_book_info(book):
     if 'Number of reviews' in book:
         print(f"Number of Reviews: {book['Number of reviews']}")
 
-def send_data_to_server(all_serialized_books):
-    deserialized_books = [CustomSerializer.deserialize(book) for book in all_serialized_books]
-    json_data = json.dumps(deserialized_books)
-    headers_json = {
-        **auth_header,
-        "Content-Type": "application/json"
-    }
-    response_json = requests.post(upload_url, headers=headers_json, data=json_data)
-    print("\nJSON Response Status Code:", response_json.status_code)
-    print("JSON Response Body:", response_json.text)
-
-    xml_data = "<books>" + "".join([CustomSerializer.serialize(book) for book in deserialized_books]) + "</books>"
-    headers_xml = {
-        **auth_header,
-        "Content-Type": "application/xml"
-    }
-    response_xml = requests.post(upload_url, headers=headers_xml, data=xml_data)
-    print("\nXML Response Status Code:", response_xml.status_code)
-    print("XML Response Body:", response_xml.text)
+# Reused for every upload, the custom format is written straight into its buffer
+payload_writer = SerializerWriter()
+uploader = BatchUploader(upload_url, headers=auth_header)
+
+def build_json(books_info):
+    return json.dumps(books_info).encode()
+
+def build_xml(books_info):
+    return payload_writer.reset().write_raw(b"<books>").write_many(books_info).write_raw(b"</books>").getvalue()
+
+def send_data_to_server(books_info):
+    # Both payloads are built from the book dicts directly, no serialize/deserialize round trip
+    for response_json, response_xml in uploader.upload(books_info, build_json, build_xml):
+        print("\nJSON Response Status Code:", response_json.status_code)
+        print("JSON Response Body:", response_json.text)
+        print("\nXML Response Status Code:", response_xml.status_code)
+        print("XML Response Body:", response_xml.text)
 
 def main():
-    get_books_info()
+    get_books_info(all_pages='--all-pages' in sys.argv)
 
-main()
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -1,40 +1,179 @@
 import socket
+import threading
 
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+BUFFER_SIZE = 4096  # Read in chunks of 4KB
+MAX_IDLE_PER_HOST = 4
 
-def retrieve_page_body(host, port, path):
-    # Create a standard TCP socket
-    client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
 
-    # Connect to the server on the specified host and port
-    client_socket.connect((host, port))
+class ConnectionPool:
+    def __init__(self, max_idle_per_host=MAX_IDLE_PER_HOST, timeout=10):
+        self.max_idle_per_host = max_idle_per_host
+        self.timeout = timeout
+        self.idle = {}
+        self.lock = threading.Lock()
+
+    def acquire(self, host, port):
+        # Reuse an idle keep-alive socket for this host if there is one
+        with self.lock:
+            sockets = self.idle.get((host, port))
+            if sockets:
+                return sockets.pop(), True
+
+        # Otherwise create a standard TCP socket and connect to the server
+        client_socket = socket.create_connection((host, port), timeout=self.timeout)
+        return client_socket, False
+
+    def release(self, host, port, client_socket):
+        # Keep the socket open for the next request to the same host
+        with self.lock:
+            sockets = self.idle.setdefault((host, port), [])
+            if len(sockets) < self.max_idle_per_host:
+                sockets.append(client_socket)
+                return
+        client_socket.close()
+
+    def close(self):
+        with self.lock:
+            for sockets in self.idle.values():
+                for client_socket in sockets:
+                    client_socket.close()
+            self.idle.clear()
+
+
+class ResponseReader:
+    def __init__(self, client_socket):
+        self.socket = client_socket
+        # Preallocated receive buffer, data lives between start and end
+        self.buffer = bytearray(BUFFER_SIZE)
+        self.view = memoryview(self.buffer)
+        self.start = 0
+        self.end = 0
+
+    def _fill(self):
+        # Make room at the end of the buffer, then receive straight into it
+        if self.end == len(self.buffer):
+            size = self.end - self.start
+            if self.start > 0:
+                self.buffer[:size] = self.buffer[self.start:self.end]
+            else:
+                self.view.release()
+                self.buffer = self.buffer + bytearray(len(self.buffer))
+                self.view = memoryview(self.buffer)
+            self.start, self.end = 0, size
+
+        received = self.socket.recv_into(self.view[self.end:])
+        if received == 0:
+            raise ConnectionError("Connection closed by the server")
+        self.end += received
+
+    def read_line(self):
+        while True:
+            index = self.buffer.find(b"\r\n", self.start, self.end)
+            if index != -1:
+                line = bytes(self.view[self.start:index])
+                self.start = index + 2
+                return line
+            self._fill()
+
+    def read_into(self, target):
+        # Copy whatever is already buffered, then receive the rest directly into target
+        buffered = min(self.end - self.start, len(target))
+        target[:buffered] = self.view[self.start:self.start + buffered]
+        self.start += buffered
+
+        position = buffered
+        while position < len(target):
+            received = self.socket.recv_into(target[position:])
+            if received == 0:
+                raise ConnectionError("Connection closed before the whole body was received")
+            position += received
+
+    def read_until_close(self):
+        body = bytearray(self.view[self.start:self.end])
+        self.start = self.end
+        while True:
+            received = self.socket.recv_into(self.view)
+            if received == 0:
+                return body
+            body += self.view[:received]
 
-    # Send HTTP GET request to the server
-    http_request = f"GET {path} HTTP/1.1\r\nHost: {host}\r\nUser-Agent: Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36\r\nConnection: close\r\n\r\n"
-    client_socket.send(http_request.encode())
+    def read_chunked(self):
+        body = bytearray()
+        while True:
+            # Chunk size is hex, optionally followed by ";extensions"
+            size = int(self.read_line().split(b";")[0], 16)
+            if size == 0:
+                break
+            position = len(body)
+            body += bytes(size)
+            with memoryview(body)[position:] as target:
+                self.read_into(target)
+            self.read_line()  # CRLF after every chunk
+
+        # Skip trailer headers up to the final empty line
+        while self.read_line():
+            pass
+        return body
+
+    def read_response(self):
+        # Parse the status line and headers one line at a time as they arrive
+        version, status = self.read_line().decode('latin-1').split(" ", 2)[:2]
+        headers = {}
+        while True:
+            line = self.read_line()
+            if not line:
+                break
+            name, _, value = line.decode('latin-1').partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+
+        if status in ("204", "304") or status.startswith("1"):
+            body = bytearray()
+        elif headers.get("transfer-encoding", "").lower() == "chunked":
+            body = self.read_chunked()
+        elif "content-length" in headers:
+            body = bytearray(int(headers["content-length"]))
+            with memoryview(body) as target:
+                self.read_into(target)
+        else:
+            # No framing information, the body ends when the server closes the connection
+            body = self.read_until_close()
+            keep_alive = False
+
+        return int(status), headers, body, keep_alive
+
+
+pool = ConnectionPool()
+
+
+def retrieve_page_body(host, port, path):
+    host_header = host if port == 80 else f"{host}:{port}"
+    http_request = f"GET {path} HTTP/1.1\r\nHost: {host_header}\r\nUser-Agent: {USER_AGENT}\r\nConnection: keep-alive\r\n\r\n".encode()
 
-    # Receive the response
-    response = b""
     while True:
-        chunk = client_socket.recv(4096)  # Read in chunks of 4KB
-        if not chunk:
-            break
-        response += chunk
-
-    # Close socket
-    client_socket.close()
-
-    # Decode response to a string
-    response_str = response.decode()
-
-    # Find beginning of response body
-    body_index = response_str.find('\r\n\r\n')
-    if body_index != -1:
-        response_text = response_str[body_index + 4:]  # Extract the body of the response
-    else:
-        print("Could not find the body of the response.")
-        response_text = ""
-
-    return response_text
+        client_socket, reused = pool.acquire(host, port)
+        reader = ResponseReader(client_socket)
+        try:
+            # Send HTTP GET request to the server and read the response
+            client_socket.sendall(http_request)
+            status, headers, body, keep_alive = reader.read_response()
+        except (OSError, ValueError) as e:
+            client_socket.close()
+            if reused:
+                # The server dropped the idle keep-alive connection, retry on a fresh one
+                continue
+            print(f"Could not retrieve the body of the response: {e}")
+            return ""
+
+        # Give the socket back only if the response was fully consumed
+        if keep_alive and reader.start == reader.end:
+            pool.release(host, port, client_socket)
+        else:
+            client_socket.close()
+
+        return body.decode()
 
 
 # Call the function for HTTP on port 80
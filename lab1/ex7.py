@@ -1,8 +1,11 @@
-import requests
-from bs4 import BeautifulSoup
-import re
 from ex1 import fetch_html
+from catalogue import iter_books
+from crawler import crawl, MAX_WORKERS, REQUESTS_PER_SECOND
+from extractors import extractor
+from prices import clean_books, clean_price
+from uploader import BatchUploader, iter_batches
 import base64
+import sys
 import xml.sax.saxutils as saxutils
 
 username = "301"
@@ -63,22 +66,10 @@ class Book:
             print(f"{key}: {value}")
         print("=" * 60)
 
-def clean_price(price_str):
-    cleaned_price = re.sub(r'[^\d.]', '', price_str)
-    return float(cleaned_price)
-
 def get_product_details(product_url):
     product_html, status = fetch_html(product_url)
     if product_html and status == "Success":
-        soup = BeautifulSoup(product_html, 'html.parser')
-        product_table = soup.find('table', class_='table table-striped')
-        product_details = {}
-        if product_table:
-            rows = product_table.find_all('tr')
-            for row in rows:
-                th = row.find('th').text.strip()
-                td = row.find('td').text.strip()
-                product_details[th] = td
+        product_details = extractor.extract_product_details(product_html)
         if 'Price (excl. tax)' in product_details:
             product_details['Price (excl. tax)'] = clean_price(product_details['Price (excl. tax)'])
         if 'Price (incl. tax)' in product_details:
@@ -89,20 +80,35 @@ def get_product_details(product_url):
     else:
         return {}
 
-def get_books_info():
-    url = "http://books.toscrape.com/"
+def get_books_info(url="http://books.toscrape.com/", max_workers=MAX_WORKERS, requests_per_second=REQUESTS_PER_SECOND,
+                   all_pages=False):
+    if all_pages:
+        # Every catalogue page, streamed: details are crawled and books uploaded one batch at a time,
+        # so only the batch in flight is in memory and there is no list to return
+        book_objs = (Book(book['name'], book['price'], book['link']) for book in iter_books(url))
+        send_data_to_server(iter_detailed_books(book_objs, max_workers, requests_per_second))
+        return None
+
     html_content, status = fetch_html(url)
     if html_content and status == "Success":
-        soup = BeautifulSoup(html_content, 'html.parser')
-        books = soup.find_all('article', class_='product_pod')
-        for book in books:
-            name = book.h3.a['title']
-            price = book.find('p', class_='price_color').text
-            product_link = book.h3.a['href']
-            full_product_link = url + product_link
-            cleaned_price = clean_price(price)
-            book_obj = Book(name, cleaned_price, full_product_link)
-            product_details = get_product_details(book_obj.link)
+        book_objs = []
+        for book in clean_books(extractor.extract_books(html_content)):
+            book_objs.append(Book(book['name'], book['price'], url + book['link']))
+
+        book_objs = list(iter_detailed_books(book_objs, max_workers, requests_per_second))
+        send_data_to_server(book_objs)
+        return book_objs
+    else:
+        print(f"Failed to fetch the website content: {status}")
+        return []
+
+def iter_detailed_books(book_objs, max_workers=MAX_WORKERS, requests_per_second=REQUESTS_PER_SECOND):
+    # Fetch the product pages of one upload batch concurrently, details come back in the same order as the batch
+    for batch in iter_batches(book_objs, uploader.batch_size):
+        all_product_details = crawl([book_obj.link for book_obj in batch], get_product_details,
+                                    max_workers=max_workers, requests_per_second=requests_per_second)
+
+        for book_obj, product_details in zip(batch, all_product_details):
             book_obj.add_details(product_details)
             book_obj.display()
             json_data = book_obj.serialize_to_json()
@@ -111,29 +117,28 @@ def get_books_info():
             print(json_data)
             print("Serialized to XML:")
             print(xml_data)
-            send_data_to_server(json_data, xml_data)
-    else:
-        print(f"Failed to fetch the website content: {status}")
+            yield book_obj
+
+uploader = BatchUploader(upload_url, headers=auth_header)
+
+# Upload contract: each request carries a batch of books, not one book. The JSON body is an array of
+# serialize_to_json() objects, the XML body wraps serialize_to_xml() elements in <books>...</books>.
+def build_json(book_objs):
+    return ("[" + ",".join(book_obj.serialize_to_json() for book_obj in book_objs) + "]").encode()
+
+def build_xml(book_objs):
+    return ("<books>" + "".join(book_obj.serialize_to_xml() for book_obj in book_objs) + "</books>").encode()
 
-def send_data_to_server(json_data, xml_data):
-    headers_json = {
-        **auth_header,
-        "Content-Type": "application/json"
-    }
-    response_json = requests.post(upload_url, headers=headers_json, data=json_data)
-    print("\nJSON Response Status Code:", response_json.status_code)
-    print("JSON Response Body:", response_json.text)
-    headers_xml = {
-        **auth_header,
-        "Content-Type": "application/xml"
-    }
-    print("\nXML Data Being Sent:")
-    print(xml_data)
-    response_xml = requests.post(upload_url, headers=headers_xml, data=xml_data)
-    print("XML Response Status Code:", response_xml.status_code)
-    print("XML Response Body:", response_xml.text)
+def send_data_to_server(book_objs):
+    # Books are uploaded in batches: one JSON and one XML request per batch instead of two per book
+    for response_json, response_xml in uploader.upload(book_objs, build_json, build_xml):
+        print("\nJSON Response Status Code:", response_json.status_code)
+        print("JSON Response Body:", response_json.text)
+        print("XML Response Status Code:", response_xml.status_code)
+        print("XML Response Body:", response_xml.text)
 
 def main():
-    get_books_info()
+    get_books_info(all_pages='--all-pages' in sys.argv)
 
-main()
+if __name__ == "__main__":
+    main()
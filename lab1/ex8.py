@@ -1,5 +1,8 @@
+import codecs
 import re
 
+ESCAPE_VALUE = re.compile(r"([{};:,\[\]])")
+
 class CustomSerializer:
     @staticmethod
     def serialize(obj):
@@ -10,7 +13,7 @@ class CustomSerializer:
             items = [CustomSerializer.serialize(item) for item in obj]
             return "[" + ",".join(items) + "]"
         elif isinstance(obj, str):
-            escaped_str = re.sub(r"([{};:,])", r"\\\1", obj)
+            escaped_str = ESCAPE_VALUE.sub(r"\\\1", obj)
             return f"s:{escaped_str}"
         elif isinstance(obj, bool):
             return f"b:{obj}"
@@ -27,58 +30,252 @@ class CustomSerializer:
 
     @staticmethod
     def deserialize(serialized_str):
-        if serialized_str.startswith("{") and serialized_str.endswith("}"):
-            serialized_str = serialized_str[1:-1]
-            items = CustomSerializer._split_items(serialized_str, ";")
-            obj = {}
-            for item in items:
-                key, value = CustomSerializer._split_items(item, ":", 1)
-                obj[key] = CustomSerializer.deserialize(value)
-            return obj
-        elif serialized_str.startswith("[") and serialized_str.endswith("]"):
-            serialized_str = serialized_str[1:-1]
-            items = CustomSerializer._split_items(serialized_str, ",")
-            return [CustomSerializer.deserialize(item) for item in items]
-        elif serialized_str.startswith("s:"):
-            return re.sub(r"\\([{};:,])", r"\1", serialized_str[2:])
-        elif serialized_str.startswith("i:"):
-            return int(serialized_str[2:])
-        elif serialized_str.startswith("f:"):
-            return float(serialized_str[2:])
-        elif serialized_str.startswith("b:"):
-            return serialized_str[2:] == "True"
-        else:
+        parser = _Parser()
+        parser.feed(serialized_str)
+        values = parser.parse(final=True)
+        if len(values) != 1 or not parser.is_complete():
             raise ValueError(f"Cannot deserialize string: {serialized_str}")
+        return values[0]
 
     @staticmethod
-    def _split_items(serialized_str, delimiter, maxsplit=-1):
-        result = []
-        current = []
-        escaped = False
-        depth = 0
-
-        for char in serialized_str:
-            if escaped:
-                current.append(char)
-                escaped = False
-            elif char == "\\":
-                escaped = True
-            elif char in "{[":
-                depth += 1
-                current.append(char)
-            elif char in "}]":
-                depth -= 1
-                current.append(char)
-            elif char == delimiter and depth == 0:
-                result.append("".join(current))
-                current = []
+    def iter_deserialize(stream, chunk_size=65536):
+        # Incremental mode: read a file (text or binary) or a socket chunk by chunk and
+        # yield every top-level dict/list as soon as it is complete, e.g. "{...}{...}[...]"
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        parser = _Parser()
+        read = stream.recv if hasattr(stream, "recv") else stream.read
+        while True:
+            chunk = read(chunk_size)
+            if not chunk:
+                break
+            parser.feed(decoder.decode(chunk) if isinstance(chunk, bytes) else chunk)
+            yield from parser.parse()
+
+        parser.feed(decoder.decode(b"", final=True))
+        yield from parser.parse(final=True)
+        if not parser.is_complete():
+            raise ValueError("Stream ended in the middle of a value")
+
+
+# Parser states
+VALUE, VALUE_OR_CLOSE, KEY, KEY_OR_CLOSE, SEPARATOR = range(5)
+
+# A scalar runs until an unescaped delimiter of its container, a key until the first unescaped ':'
+DICT_SCALAR = re.compile(r"(?:[^\\;}]+|\\[{};:,\[\]]?)*")
+LIST_SCALAR = re.compile(r"(?:[^\\,\]]+|\\[{};:,\[\]]?)*")
+KEY_PATTERN = re.compile(r"(?:[^\\:]+|\\.?)*", re.S)
+UNESCAPE_VALUE = re.compile(r"\\([{};:,\[\]])")
+CLOSER_FOLLOWERS = ",;]}"
+TOP_LEVEL_CLOSER_FOLLOWERS = ",;]}[{"  # In a stream the next document may follow a top-level list directly
+UNESCAPE_KEY = re.compile(r"\\(.)", re.S)
+
+
+def _list_scalar_end(buf, pos, end, final, followers=CLOSER_FOLLOWERS):
+    # serialize used to leave '[' and ']' unescaped, so a bare ']' may belong to a string: "[s:x]y]" is ['x]y'].
+    # A bare ']' closes the list only when a delimiter or the end of the input follows it.
+    # Returns None when the buffer ends before that can be decided.
+    stop = LIST_SCALAR.match(buf, pos).end()
+    while stop < end and buf[stop] == "]":
+        if stop + 1 == end:
+            return stop if final else None
+        if buf[stop + 1] in followers:
+            return stop
+        stop = LIST_SCALAR.match(buf, stop + 1).end()
+    return None if stop == end and not final else stop
+
+
+def _scalar(tag, text):
+    if tag == "s:":
+        return UNESCAPE_VALUE.sub(r"\1", text) if "\\" in text else text
+    elif tag == "i:":
+        return int(text)
+    elif tag == "f:":
+        return float(text)
+    elif tag == "b:":
+        return text == "True"
+    raise ValueError(f"Cannot deserialize value with tag: {tag}")
+
+
+class _Parser:
+    # Single pass, index based parser with an explicit stack instead of recursion.
+    # It stops at a token boundary when the buffer runs out, so more text can be fed later.
+    def __init__(self):
+        self.buffer = ""
+        self.pos = 0
+        self.stack = []  # [container, pending key] per open dict/list
+        self.state = VALUE
+
+    def feed(self, text):
+        # Drop what is already parsed, only the unfinished tail is kept
+        self.buffer = self.buffer[self.pos:] + text
+        self.pos = 0
+
+    def is_complete(self):
+        return not self.stack and self.pos == len(self.buffer)
+
+    def parse(self, final=False):
+        buf = self.buffer
+        end = len(buf)
+        pos = self.pos
+        stack = self.stack
+        state = self.state
+        values = []
+
+        while pos < end:
+            value_ready = False
+
+            if state == VALUE or state == VALUE_OR_CLOSE:
+                char = buf[pos]
+                if char == "{":
+                    stack.append([{}, None])
+                    state = KEY_OR_CLOSE
+                    pos += 1
+                elif char == "[":
+                    stack.append([[], None])
+                    state = VALUE_OR_CLOSE
+                    pos += 1
+                elif char == "]" and state == VALUE_OR_CLOSE:
+                    value = stack.pop()[0]
+                    value_ready = True
+                    pos += 1
+                else:
+                    if pos + 2 > end and not final:
+                        break
+                    tag = buf[pos:pos + 2]
+                    if not stack:
+                        # A top-level scalar only ends with the input
+                        if not final:
+                            break
+                        stop = end
+                    elif isinstance(stack[-1][0], dict):
+                        stop = DICT_SCALAR.match(buf, pos + 2).end()
+                        if stop == end and not final:
+                            break
+                    else:
+                        followers = TOP_LEVEL_CLOSER_FOLLOWERS if len(stack) == 1 else CLOSER_FOLLOWERS
+                        stop = _list_scalar_end(buf, pos + 2, end, final, followers)
+                        if stop is None:
+                            break
+                    value = _scalar(tag, buf[pos + 2:stop])
+                    value_ready = True
+                    pos = stop
+
+            elif state == KEY or state == KEY_OR_CLOSE:
+                if state == KEY_OR_CLOSE and buf[pos] == "}":
+                    value = stack.pop()[0]
+                    value_ready = True
+                    pos += 1
+                else:
+                    stop = KEY_PATTERN.match(buf, pos).end()
+                    if stop == end:
+                        if final:
+                            raise ValueError(f"Missing ':' after key: {buf[pos:stop]}")
+                        break
+                    key = buf[pos:stop]
+                    stack[-1][1] = UNESCAPE_KEY.sub(r"\1", key) if "\\" in key else key
+                    state = VALUE
+                    pos = stop + 1
+
             else:
-                current.append(char)
+                char = buf[pos]
+                if isinstance(stack[-1][0], dict):
+                    if char == ";":
+                        state = KEY
+                    elif char == "}":
+                        value = stack.pop()[0]
+                        value_ready = True
+                    else:
+                        raise ValueError(f"Expected ';' or '}}' at position {pos}, found {char!r}")
+                else:
+                    if char == ",":
+                        state = VALUE
+                    elif char == "]":
+                        value = stack.pop()[0]
+                        value_ready = True
+                    else:
+                        raise ValueError(f"Expected ',' or ']' at position {pos}, found {char!r}")
+                pos += 1
+
+            if value_ready:
+                if not stack:
+                    values.append(value)
+                    state = VALUE
+                else:
+                    container, key = stack[-1]
+                    if isinstance(container, dict):
+                        container[key] = value
+                    else:
+                        container.append(value)
+                    state = SEPARATOR
+
+        self.pos = pos
+        self.state = state
+        return values
+
+class SerializerWriter:
+    # Writes the same format as CustomSerializer.serialize straight into one bytearray.
+    # Call reset() to reuse the writer (and its buffer object) for the next payload.
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def reset(self):
+        del self.buffer[:]
+        return self
+
+    def write(self, obj):
+        self._write(obj, self.buffer)
+        return self
+
+    def write_many(self, objs, separator=b""):
+        # Serialize a sequence of objects as one stream, e.g. every book of a catalogue
+        out = self.buffer
+        for index, obj in enumerate(objs):
+            if index and separator:
+                out += separator
+            self._write(obj, out)
+        return self
+
+    def write_raw(self, data):
+        self.buffer += data
+        return self
+
+    def getvalue(self):
+        return bytes(self.buffer)
+
+    def getbuffer(self):
+        return memoryview(self.buffer)
+
+    def _write(self, obj, out):
+        if isinstance(obj, dict):
+            out += b"{"
+            first = True
+            for key, value in obj.items():
+                if not first:
+                    out += b";"
+                first = False
+                out += CustomSerializer.serialize_key(key).encode()
+                out += b":"
+                self._write(value, out)
+            out += b"}"
+        elif isinstance(obj, list):
+            out += b"["
+            for index, item in enumerate(obj):
+                if index:
+                    out += b","
+                self._write(item, out)
+            out += b"]"
+        elif isinstance(obj, str):
+            out += b"s:"
+            out += ESCAPE_VALUE.sub(r"\\\1", obj).encode()
+        elif isinstance(obj, bool):
+            out += b"b:True" if obj else b"b:False"
+        elif isinstance(obj, int):
+            out += b"i:%d" % obj
+        elif isinstance(obj, float):
+            out += f"f:{obj}".encode()
+        else:
+            raise TypeError(f"Type {type(obj)} not supported for serialization.")
 
-        result.append("".join(current))
-        if maxsplit != -1:
-            return result[:maxsplit] + [delimiter.join(result[maxsplit:])]
-        return result
 
 def main():
     original_data = {
@@ -101,4 +298,5 @@ def main():
     print("\nDeserialized Data:")
     print(deserialized_data)
 
-main()
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+import os
+from html.parser import HTMLParser
+from bs4 import BeautifulSoup
+
+try:
+    from lxml import etree, html as lxml_html
+except ImportError:
+    lxml_html = None
+
+# Every extractor returns the same plain data:
+#   extract_books(html)           -> [{'name', 'price', 'link'}] with the raw price text and relative link
+#   extract_product_details(html) -> {th: td} from the product information table
+#   extract_next_page(html)       -> href of the "next" pager link or None
+#   extract_listing(html)         -> (extract_books(html), extract_next_page(html)) from a single parse
+
+
+class SoupExtractor:
+    # The original path: full BeautifulSoup tree with html.parser
+    name = "soup"
+
+    def extract_books(self, html_content):
+        return self.extract_listing(html_content)[0]
+
+    def extract_listing(self, html_content):
+        soup = BeautifulSoup(html_content, 'html.parser')
+        books = []
+        for book in soup.find_all('article', class_='product_pod'):
+            books.append({
+                'name': book.h3.a['title'],
+                'price': book.find('p', class_='price_color').text,
+                'link': book.h3.a['href']
+            })
+        next_item = soup.find('li', class_='next')
+        return books, next_item.a['href'] if next_item and next_item.a else None
+
+    def extract_product_details(self, html_content):
+        soup = BeautifulSoup(html_content, 'html.parser')
+        product_table = soup.find('table', class_='table-striped')
+        product_details = {}
+        if product_table:
+            for row in product_table.find_all('tr'):
+                th = row.find('th').text.strip()
+                td = row.find('td').text.strip()
+                product_details[th] = td
+        return product_details
+
+    def extract_next_page(self, html_content):
+        return self.extract_listing(html_content)[1]
+
+
+def _has_class(attrs, class_name):
+    for key, value in attrs:
+        if key == 'class' and value and class_name in value.split():
+            return True
+    return False
+
+
+class _ListingParser(HTMLParser):
+    # Only keeps state while inside a product_pod article or the pager, nothing else is stored
+    def __init__(self):
+        super().__init__()
+        self.books = []
+        self.next_page = None
+        self.book = None
+        self.in_title = False
+        self.price_parts = None
+        self.in_next = False
+
+    def handle_starttag(self, tag, attrs):
+        if self.book is not None:
+            if tag == 'h3':
+                self.in_title = True
+            elif tag == 'a' and self.in_title and 'name' not in self.book:
+                attributes = dict(attrs)
+                self.book['name'] = attributes.get('title')
+                self.book['link'] = attributes.get('href')
+            elif tag == 'p' and self.price_parts is None and 'price' not in self.book and _has_class(attrs, 'price_color'):
+                self.price_parts = []
+        elif tag == 'article' and _has_class(attrs, 'product_pod'):
+            self.book = {}
+        elif tag == 'li' and _has_class(attrs, 'next'):
+            self.in_next = True
+        elif tag == 'a' and self.in_next and self.next_page is None:
+            self.next_page = dict(attrs).get('href')
+
+    def handle_endtag(self, tag):
+        if self.book is None:
+            if tag == 'li':
+                self.in_next = False
+        elif tag == 'h3':
+            self.in_title = False
+        elif tag == 'p' and self.price_parts is not None:
+            self.book['price'] = ''.join(self.price_parts)
+            self.price_parts = None
+        elif tag == 'article':
+            self.books.append({'name': self.book.get('name'), 'price': self.book.get('price'), 'link': self.book.get('link')})
+            self.book = None
+
+    def handle_data(self, data):
+        if self.price_parts is not None:
+            self.price_parts.append(data)
+
+
+class _ProductTableParser(HTMLParser):
+    # Collects th/td text of the first product table and ignores the rest of the page
+    def __init__(self):
+        super().__init__()
+        self.details = {}
+        self.state = 'before'  # before -> table -> done
+        self.cell = None
+        self.parts = []
+        self.row = {}
+
+    def handle_starttag(self, tag, attrs):
+        if self.state == 'before' and tag == 'table' and _has_class(attrs, 'table-striped'):
+            self.state = 'table'
+        elif self.state == 'table':
+            if tag == 'tr':
+                self.row = {}
+            elif tag in ('th', 'td') and tag not in self.row:
+                self.cell = tag
+                self.parts = []
+
+    def handle_endtag(self, tag):
+        if self.state != 'table':
+            return
+        if tag == self.cell:
+            self.row[tag] = ''.join(self.parts).strip()
+            self.cell = None
+        elif tag == 'tr' and 'th' in self.row and 'td' in self.row:
+            self.details[self.row['th']] = self.row['td']
+        elif tag == 'table':
+            self.state = 'done'
+
+    def handle_data(self, data):
+        if self.cell:
+            self.parts.append(data)
+
+
+class StreamingExtractor:
+    # SAX-style pass over the markup with the stdlib tokenizer, no tree is built
+    name = "streaming"
+
+    def extract_books(self, html_content):
+        return self.extract_listing(html_content)[0]
+
+    def extract_listing(self, html_content):
+        parser = _ListingParser()
+        parser.feed(html_content)
+        parser.close()
+        return parser.books, parser.next_page
+
+    def extract_product_details(self, html_content):
+        parser = _ProductTableParser()
+        parser.feed(html_content)
+        parser.close()
+        return parser.details
+
+    def extract_next_page(self, html_content):
+        return self.extract_listing(html_content)[1]
+
+
+def _class_test(class_name):
+    return f'contains(concat(" ", normalize-space(@class), " "), " {class_name} ")'
+
+
+class LxmlExtractor:
+    # libxml2 parser with precompiled XPath queries
+    name = "lxml"
+
+    def __init__(self):
+        if lxml_html is None:
+            raise ImportError("lxml is not installed")
+        self.find_books = etree.XPath(f'//article[{_class_test("product_pod")}]')
+        self.find_title_link = etree.XPath('./h3/a')
+        self.find_price = etree.XPath(f'.//p[{_class_test("price_color")}]')
+        self.find_product_rows = etree.XPath(f'(//table[{_class_test("table-striped")}])[1]//tr')
+        self.find_next_link = etree.XPath(f'//li[{_class_test("next")}]/a/@href')
+
+    def extract_books(self, html_content):
+        return self._books(lxml_html.fromstring(html_content))
+
+    def _books(self, tree):
+        books = []
+        for book in self.find_books(tree):
+            link = self.find_title_link(book)[0]
+            books.append({
+                'name': link.get('title'),
+                'price': self.find_price(book)[0].text_content(),
+                'link': link.get('href')
+            })
+        return books
+
+    def extract_listing(self, html_content):
+        tree = lxml_html.fromstring(html_content)
+        return self._books(tree), self._next_page(tree)
+
+    def extract_product_details(self, html_content):
+        tree = lxml_html.fromstring(html_content)
+        product_details = {}
+        for row in self.find_product_rows(tree):
+            th = row.find('th')
+            td = row.find('td')
+            product_details[th.text_content().strip()] = td.text_content().strip()
+        return product_details
+
+    def extract_next_page(self, html_content):
+        return self._next_page(lxml_html.fromstring(html_content))
+
+    def _next_page(self, tree):
+        links = self.find_next_link(tree)
+        return links[0] if links else None
+
+
+EXTRACTORS = {
+    SoupExtractor.name: SoupExtractor,
+    StreamingExtractor.name: StreamingExtractor,
+    LxmlExtractor.name: LxmlExtractor,
+}
+
+
+def get_extractor(name=None):
+    # HTML_EXTRACTOR picks the backend, by default lxml when installed and the streaming parser otherwise
+    name = name or os.getenv("HTML_EXTRACTOR") or ("lxml" if lxml_html is not None else "streaming")
+    if name not in EXTRACTORS:
+        raise ValueError(f"Unknown extractor '{name}', choose one of: {', '.join(EXTRACTORS)}")
+    return EXTRACTORS[name]()
+
+
+extractor = get_extractor()
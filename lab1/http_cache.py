@@ -0,0 +1,120 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+CACHE_DIR = os.getenv("HTTP_CACHE_DIR", ".http_cache")
+CACHE_TTL = float(os.getenv("HTTP_CACHE_TTL", "300"))  # Seconds a page is served without asking the server
+CACHE_MAX_ENTRIES = int(os.getenv("HTTP_CACHE_MAX_ENTRIES", "512"))
+
+
+class HTTPCache:
+    def __init__(self, cache_dir=CACHE_DIR, ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # In-memory LRU, least recently used url first. The disk keeps the same set of entries.
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+            self._trim_disk()
+
+    def _path(self, url):
+        return os.path.join(self.cache_dir, hashlib.sha256(url.encode()).hexdigest() + ".json")
+
+    def _trim_disk(self):
+        # Drop the oldest files left over from previous runs so the disk obeys the same cap
+        files = [os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir) if name.endswith(".json")]
+        files.sort(key=os.path.getmtime, reverse=True)
+        for path in files[self.max_entries:]:
+            os.remove(path)
+
+    def _load(self, url):
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._path(url), "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _save(self, url, entry):
+        if not self.cache_dir:
+            return
+        path = self._path(url)
+        with open(path + ".tmp", "w") as f:
+            json.dump(entry, f)
+        os.replace(path + ".tmp", path)
+
+    def _remember(self, url, entry):
+        self.entries[url] = entry
+        self.entries.move_to_end(url)
+        while len(self.entries) > self.max_entries:
+            evicted_url, _ = self.entries.popitem(last=False)
+            if self.cache_dir:
+                try:
+                    os.remove(self._path(evicted_url))
+                except FileNotFoundError:
+                    pass
+
+    def lookup(self, url):
+        # Returns (entry, fresh). A fresh entry can be used without contacting the server.
+        with self.lock:
+            # Anything but a fresh entry means a network fetch, counted as a miss whatever the response is.
+            # revalidated counts the misses the server answered with 304.
+            entry = self.entries.get(url)
+            if entry is None:
+                entry = self._load(url)
+                if entry is None:
+                    self.misses += 1
+                    return None, False
+            self._remember(url, entry)
+            fresh = time.time() - entry["stored_at"] < self.ttl
+            if fresh:
+                self.hits += 1
+            else:
+                self.misses += 1
+            return entry, fresh
+
+    def validation_headers(self, entry):
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def store(self, url, body, etag=None, last_modified=None):
+        entry = {
+            "body": body,
+            "etag": etag,
+            "last_modified": last_modified,
+            "stored_at": time.time()
+        }
+        with self.lock:
+            self._remember(url, entry)
+            self._save(url, entry)
+        return entry
+
+    def mark_revalidated(self, url, entry):
+        # Server answered 304, the cached body is good for another ttl
+        with self.lock:
+            self.revalidated += 1
+            entry["stored_at"] = time.time()
+            self._remember(url, entry)
+            self._save(url, entry)
+
+    def stats(self):
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "revalidated": self.revalidated,
+                "misses": self.misses,
+                "entries": len(self.entries)
+            }
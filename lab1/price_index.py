@@ -0,0 +1,47 @@
+import numpy as np
+from prices import GBP_TO_MDL_RATE
+
+
+class BookColumns:
+    # Books stored column-wise with an index sorted by MDL price:
+    # range lookups are two searchsorted calls and range sums come from a prefix sum.
+    def __init__(self, books_info, rate=GBP_TO_MDL_RATE):
+        self.books = list(books_info)
+        self.price_gbp = np.fromiter((book['price'] for book in self.books), dtype=np.float64, count=len(self.books))
+        self.price_mdl = self.price_gbp * rate
+        self.order = np.argsort(self.price_mdl, kind='stable')
+        self.sorted_mdl = self.price_mdl[self.order]
+        self.prefix_sum = np.concatenate(([0.0], np.cumsum(self.sorted_mdl)))
+
+    def __len__(self):
+        return len(self.books)
+
+    def _bounds(self, min_price, max_price):
+        low = np.searchsorted(self.sorted_mdl, min_price, side='left')
+        high = np.searchsorted(self.sorted_mdl, max_price, side='right')
+        return low, np.maximum(low, high)
+
+    def range_indices(self, min_price, max_price):
+        # Positions in self.books with min_price <= price_mdl <= max_price, in original order
+        low, high = self._bounds(min_price, max_price)
+        return np.sort(self.order[low:high])
+
+    def range_sum(self, min_price, max_price):
+        low, high = self._bounds(min_price, max_price)
+        return float(self.prefix_sum[high] - self.prefix_sum[low])
+
+    def batch_query(self, ranges):
+        # Answer many (min, max) queries at once, returns (counts, sums) arrays
+        ranges = np.asarray(ranges, dtype=np.float64).reshape(-1, 2)
+        low, high = self._bounds(ranges[:, 0], ranges[:, 1])
+        return high - low, self.prefix_sum[high] - self.prefix_sum[low]
+
+    def filtered_books(self, min_price, max_price):
+        # Same records as ex5.filter_books_by_price, with price_gbp / price_mdl filled in
+        filtered = []
+        for index in self.range_indices(min_price, max_price):
+            book = dict(self.books[index])
+            book['price_gbp'] = float(self.price_gbp[index])
+            book['price_mdl'] = float(self.price_mdl[index])
+            filtered.append(book)
+        return filtered
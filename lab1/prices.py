@@ -0,0 +1,42 @@
+import re
+from decimal import Decimal
+
+# Compiled once and shared by every scraper
+NON_PRICE_CHARS = re.compile(r'[^\d.]')
+NON_PRICE_CHARS_BATCH = re.compile(r'[^\d.\x00]')  # NUL separates the prices of a batch
+CURRENCY_PATTERN = re.compile(r'[£$€]|\b(?:GBP|USD|EUR|MDL)\b')
+CURRENCY_CODES = {'£': 'GBP', '$': 'USD', '€': 'EUR'}
+GBP_TO_MDL_RATE = 22.5
+
+
+def _strip_prices(price_strs):
+    # One regex pass over the whole column: join, strip everything but digits/dots, split back
+    return NON_PRICE_CHARS_BATCH.sub('', "\x00".join(price_strs)).split("\x00")
+
+
+def clean_price(price_str, as_decimal=False):
+    cleaned_price = NON_PRICE_CHARS.sub('', price_str)
+    return Decimal(cleaned_price) if as_decimal else float(cleaned_price)
+
+
+def detect_currency(price_str):
+    match = CURRENCY_PATTERN.search(price_str)
+    if not match:
+        return None
+    return CURRENCY_CODES.get(match.group(), match.group())
+
+
+def clean_books(books_info, as_decimal=False, with_currency=False):
+    # Clean a whole page of records at once, the input dicts are left untouched
+    books_info = list(books_info)
+    raw_prices = [book['price'] for book in books_info]
+    to_number = Decimal if as_decimal else float
+
+    cleaned_books = []
+    for book, raw_price, price in zip(books_info, raw_prices, _strip_prices(raw_prices)):
+        cleaned = dict(book, name=book['name'].strip(), price=to_number(price))
+        if with_currency:
+            cleaned['currency'] = detect_currency(raw_price)
+        cleaned_books.append(cleaned)
+    return cleaned_books
+
@@ -0,0 +1,102 @@
+import os
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+os.environ["HTTP_CACHE"] = "0"  # Every crawl must reach the fixture server
+
+from crawler import crawl
+from ex1 import fetch_html
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    # /page/<n>?delay=<seconds>: answers "page <n>" after the delay, while counting requests in flight
+    def do_GET(self):
+        server = self.server
+        path, _, query = self.path.partition("?")
+        delay = float(query.split("=", 1)[1]) if query.startswith("delay=") else 0
+        with server.lock:
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        try:
+            time.sleep(delay)
+            body = f"page {path.rsplit('/', 1)[-1]}".encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeTime:
+    # Stands in for the time module inside crawler: the clock stays at 0, sleep only notes how long the
+    # calling thread would have waited, and fetch records that as the time its request would have started
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.starts = []
+        self.waited = threading.local()
+
+    def monotonic(self):
+        return 0.0
+
+    def sleep(self, delay):
+        self.waited.delay = delay
+
+    def fetch(self, url):
+        with self.lock:
+            self.starts.append((url, getattr(self.waited, "delay", 0.0)))
+        self.waited.delay = 0.0
+        return url
+
+
+class CrawlTest(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), FixtureHandler)
+        self.server.lock = threading.Lock()
+        self.server.in_flight = 0
+        self.server.max_in_flight = 0
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def fetch(self, url):
+        html, status = fetch_html(url)
+        self.assertEqual(status, "Success")
+        return html
+
+    def test_concurrency_limit(self):
+        urls = [f"{self.base_url}/page/{n}?delay=0.1" for n in range(12)]
+        crawl(urls, self.fetch, max_workers=3, requests_per_second=0)
+        self.assertEqual(self.server.max_in_flight, 3)
+
+    def test_rate_limit(self):
+        # The limiter's own clock, not arrival times at the server, which carry network and scheduling jitter
+        clock = FakeTime()
+        urls = [f"http://a.example/{n}" for n in range(8)] + [f"http://b.example/{n}" for n in range(2)]
+        with mock.patch("crawler.time", clock):
+            crawl(urls, clock.fetch, max_workers=10, requests_per_second=20)
+        # 20 requests per second to one host: its requests start 50 ms apart, other hosts keep their own schedule
+        self.assertEqual(sorted(round(start, 3) for url, start in clock.starts if "a.example" in url),
+                         [round(n * 0.05, 3) for n in range(8)])
+        self.assertEqual(sorted(round(start, 3) for url, start in clock.starts if "b.example" in url), [0, 0.05])
+
+    def test_results_in_input_order(self):
+        # Earlier pages answer slower, so they finish last
+        urls = [f"{self.base_url}/page/{n}?delay={0.05 * (6 - n)}" for n in range(6)]
+        results = crawl(urls, self.fetch, max_workers=6, requests_per_second=0)
+        self.assertEqual(results, [f"page {n}" for n in range(6)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+import io
+import unittest
+
+from ex8 import CustomSerializer, SerializerWriter
+
+TRICKY_STRINGS = ["x]y", "]", "[", "a[b", "a]b", "[x]", "a,b", "a;b", "a:b", "{a}", "]]],[[[", ";,]}", "x]", "[x"]
+
+
+class SerializerRoundTripTest(unittest.TestCase):
+    def assertRoundTrip(self, obj):
+        serialized = CustomSerializer.serialize(obj)
+        self.assertEqual(CustomSerializer.deserialize(serialized), obj)
+        self.assertEqual(SerializerWriter().write(obj).getvalue().decode(), serialized)
+        # Incremental mode must agree however the text is chunked
+        for chunk_size in (1, 2, 7):
+            self.assertEqual(list(CustomSerializer.iter_deserialize(io.StringIO(serialized), chunk_size)), [obj])
+
+    def test_strings_in_lists(self):
+        for text in TRICKY_STRINGS:
+            with self.subTest(text=text):
+                self.assertRoundTrip([text])
+                self.assertRoundTrip([text, "after", 1])
+                self.assertRoundTrip(["before", text])
+
+    def test_strings_in_dicts(self):
+        for text in TRICKY_STRINGS:
+            with self.subTest(text=text):
+                self.assertRoundTrip({"k": text})
+                self.assertRoundTrip({"k": text, "j": 1, "l": [text]})
+
+    def test_nested(self):
+        self.assertRoundTrip({"books": [{"name": text, "tags": [text, text], "price": 1.5, "ok": True}
+                                        for text in TRICKY_STRINGS]})
+        self.assertRoundTrip([[["x]y"], "]"], {"a": ["[", {"b": "]"}]}])
+
+    def test_legacy_unescaped_brackets(self):
+        # serialize used to leave brackets unescaped, such output must still deserialize as before
+        self.assertEqual(CustomSerializer.deserialize("[s:x]y]"), ["x]y"])
+        self.assertEqual(CustomSerializer.deserialize("[s:a[b]"), ["a[b"])
+        self.assertEqual(CustomSerializer.deserialize("{k:s:x]y}"), {"k": "x]y"})
+        self.assertEqual(list(CustomSerializer.iter_deserialize(io.StringIO("[s:x]y][s:z]"), 1)), [["x]y"], ["z"]])
+
+
+if __name__ == "__main__":
+    unittest.main()
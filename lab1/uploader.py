@@ -0,0 +1,63 @@
+import gzip
+import os
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+UPLOAD_URL = "http://localhost:8000/upload"
+BATCH_SIZE = int(os.getenv("UPLOAD_BATCH_SIZE", "50"))
+COMPRESS = os.getenv("UPLOAD_GZIP", "0") == "1"
+
+
+def iter_batches(items, size):
+    # Lists of up to size items taken from any iterable as it goes, a stream is never held whole
+    items = iter(items)
+    batch = list(islice(items, size))
+    while batch:
+        yield batch
+        batch = list(islice(items, size))
+
+
+class BatchUploader:
+    def __init__(self, url=UPLOAD_URL, headers=None, batch_size=BATCH_SIZE, compress=COMPRESS,
+                 retries=3, backoff_factor=0.5, max_workers=2):
+        self.url = url
+        self.batch_size = batch_size
+        self.compress = compress
+
+        # One persistent session: keep-alive connections and retries with exponential backoff.
+        # Uploads are POSTs and not idempotent, so only failures where the server cannot have taken the batch
+        # are retried: connection errors and 429/503. A read timeout may come after the batch was stored.
+        retry = Retry(total=retries, connect=retries, read=0, other=0, status=retries, backoff_factor=backoff_factor,
+                      status_forcelist=(429, 503), allowed_methods=None, raise_on_status=False)
+        adapter = HTTPAdapter(max_retries=retry, pool_maxsize=max_workers)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update(headers or {})
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    def post(self, data, content_type):
+        headers = {"Content-Type": content_type}
+        if self.compress:
+            data = gzip.compress(data)
+            headers["Content-Encoding"] = "gzip"
+        return self.session.post(self.url, data=data, headers=headers)
+
+    def upload(self, items, to_json, to_xml):
+        # to_json / to_xml turn one batch of items into a request body (bytes).
+        # JSON and XML requests of every batch run concurrently, results come back per batch in order.
+        # items may be a generator: each batch is sent as soon as it is complete, not after the whole stream.
+        pending = []
+        for batch in iter_batches(items, self.batch_size):
+            pending.append((
+                self.executor.submit(self.post, to_json(batch), "application/json"),
+                self.executor.submit(self.post, to_xml(batch), "application/xml")
+            ))
+        return [(json_request.result(), xml_request.result()) for json_request, xml_request in pending]
+
+    def close(self):
+        self.executor.shutdown()
+        self.session.close()
@@ -1,24 +1,54 @@
-from flask import Flask, request, jsonify, send_file
-from database import SessionLocal, create_tables
+from flask import Flask, Response, request, jsonify, send_file
+from sqlalchemy.exc import IntegrityError
+from werkzeug.utils import secure_filename
+from database import Session, SessionLocal, create_tables, pool_metrics
+from cache import BookCache, get_cache
+from file_store import UPLOAD_FOLDER, UploadRequest, discard_uploads, store_upload
 from models.models import Book
+from queries import (EXPORT_FORMATS, book_to_dict, bulk_chunks, decode_cursor, export_chunks, export_statement,
+                     finish_bulk, keyset_statement, new_file_metadata, next_cursor, offset_statement, parse_ndjson,
+                     parse_price_filter, parse_sort, plan_bulk, record_written, upsert_statement, written_ids)
+import hashlib
+import json
 import os
 
 app = Flask(__name__)
+app.request_class = UploadRequest
+# Let a fronting Apache/lighttpd send attachments itself (X-Sendfile) instead of a worker
+app.config['USE_X_SENDFILE'] = os.getenv("USE_X_SENDFILE", "0") == "1"
 
-UPLOAD_FOLDER = 'uploads'
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
-# Create a new session for each request
+book_cache = BookCache(get_cache())
+
+# The session of the current request, created on first use
 def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+    return Session()
+
+# Close the request's session and give its connection back to the pool, even when the view raised
+@app.teardown_appcontext
+def remove_session(exception=None):
+    Session.remove()
+
+@app.teardown_request
+def remove_uploads(exception=None):
+    discard_uploads(request)
+
+# JSON response with an ETag, answers If-None-Match with 304 Not Modified
+def json_response(body):
+    response = app.response_class(body, mimetype='application/json')
+    response.set_etag(hashlib.md5(body.encode()).hexdigest())
+    return response.make_conditional(request)
+
+def offset_page(db, offset, limit, filters=None, sort='id', include_files=False):
+    return db.scalars(offset_statement(offset, limit, filters, sort, include_files)).all()
+
+def keyset_page(db, after_id, limit, filters=None, sort='id', after_value=None, include_files=False):
+    return db.scalars(keyset_statement(after_id, limit, filters, sort, after_value, include_files)).all()
 
 @app.route('/books', methods=['POST'])
 def create_book():
-    db = next(get_db())
+    db = get_db()
     data = request.form
 
     # Extract and validate required fields
@@ -42,73 +72,171 @@ def create_book():
 
     file = request.files.get('file')
 
-    # Check if book with same name and author exists
-    if db.query(Book).filter_by(name=name, author=author).first():
-        return jsonify({"error": "Book with the same name and author already exists"}), 400
-
-    # Handle the uploaded file if present
-    file_path = None
-    if file:
-        file_path = os.path.join(UPLOAD_FOLDER, file.filename)
-        file.save(file_path)
-
     new_book = Book(
         name=name,
         author=author,
-        price=price,
-        file_path=file_path
+        price=price
     )
 
+    # The unique_book constraint is the duplicate check: one INSERT, no SELECT before it,
+    # and concurrent writers of the same book cannot both get through
     db.add(new_book)
+    try:
+        db.flush()
+    except IntegrityError:
+        db.rollback()
+        return jsonify({"error": "Book with the same name and author already exists"}), 400
+
+    # Handle the uploaded file if present, only once the row is known to be new.
+    # It is already on disk, storing it is a rename to its sha256 path (or nothing if that content exists).
+    if file:
+        new_book.file_path, _ = store_upload(file)
+        # Added on its own, not through new_book.file_metadata, which would first load the (empty) old value
+        db.add(new_file_metadata(new_book.id, file.filename, os.path.getsize(new_book.file_path)))
+
+    # Serialize before commit, the row is expired afterwards and would be reloaded with a SELECT
+    book = book_to_dict(new_book)
     db.commit()
+    book_cache.invalidate()
+
+    return jsonify({"message": "Book added successfully", "book": book}), 201
 
-    return jsonify({"message": "Book added successfully", "book": {
-        "id": new_book.id,
-        "name": new_book.name,
-        "author": new_book.author,
-        "price": new_book.price,
-        "file_path": new_book.file_path
-    }}), 201
+def read_bulk_rows():
+    # A JSON array, or NDJSON (one object per line) read straight from the request stream
+    if request.mimetype in ('application/x-ndjson', 'application/jsonl'):
+        return parse_ndjson(request.stream)
+    rows = request.get_json(silent=True)
+    return rows if isinstance(rows, list) else None
+
+@app.route('/books/bulk', methods=['POST'])
+def create_books_bulk():
+    db = get_db()
+    rows = read_bulk_rows()
+    if rows is None:
+        return jsonify({"error": "Body must be a JSON array or NDJSON"}), 400
+    update_existing = request.args.get('on_conflict', 'ignore') == 'update'
+
+    results, to_write = plan_bulk(rows)
+    dialect = db.get_bind().dialect.name
+    for chunk in bulk_chunks(to_write):
+        record_written(results, to_write, db.execute(upsert_statement(dialect, chunk, update_existing)).all(), update_existing)
+    db.commit()
+
+    report = finish_bulk(results, to_write)
+    ids = written_ids(results)
+    if ids:
+        book_cache.invalidate(*ids)
+    return jsonify(report)
 
 # Read all books with pagination
+# ?offset=&limit= returns a plain list (offset pagination)
+# ?after=<cursor>&limit= returns {"books": [...], "next_cursor": ...} (keyset pagination, pass after= to start)
+# Both accept author=, name_prefix=, min_price=, max_price= and sort= (id, name, author, price, -price, ...)
+# include=files adds each book's file_metadata, loaded in the same query
 @app.route('/books', methods=['GET'])
 def get_books():
-    db = next(get_db())
-    offset = request.args.get('offset', default=0, type=int)
     limit = request.args.get('limit', default=5, type=int)
+    after = request.args.get('after')
+    sort = request.args.get('sort', 'id')
+    include_files = 'files' in request.args.get('include', '').split(',')
+    filters = {
+        'author': request.args.get('author'),
+        'name_prefix': request.args.get('name_prefix'),
+        'min_price': request.args.get('min_price'),
+        'max_price': request.args.get('max_price')
+    }
+    try:
+        parse_sort(sort)
+        for name in ('min_price', 'max_price'):
+            filters[name] = parse_price_filter(filters[name], name)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if after is not None:
+        try:
+            after_id, after_value = decode_cursor(after, sort) if after else (None, None)
+        except ValueError:
+            return jsonify({"error": "Invalid cursor"}), 400
+
+        key = book_cache.page_key(json.dumps(["after", after_id, after_value, limit, sort, filters, include_files]))
+        body = book_cache.get(key)
+        if body is None:
+            books = keyset_page(get_db(), after_id, limit, filters, sort, after_value, include_files)
+            body = app.json.dumps({"books": [book_to_dict(book, include_files) for book in books],
+                                   "next_cursor": next_cursor(books, limit, sort)})
+            book_cache.set(key, body)
+        return json_response(body)
+
+    offset = request.args.get('offset', default=0, type=int)
+    key = book_cache.page_key(json.dumps(["offset", offset, limit, sort, filters, include_files]))
+    body = book_cache.get(key)
+    if body is None:
+        books = offset_page(get_db(), offset, limit, filters, sort, include_files)
+        body = app.json.dumps([book_to_dict(book, include_files) for book in books])
+        book_cache.set(key, body)
+    return json_response(body)
+
+def iter_book_rows():
+    # Yields lists of row tuples from a server-side cursor, the table is never loaded at once.
+    # The export runs after the view has returned, so it uses its own session.
+    with SessionLocal() as db:
+        for rows in db.execute(export_statement()).partitions():
+            yield rows
 
-    books = db.query(Book).offset(offset).limit(limit).all()
-    result = [{
-        "id": book.id,
-        "name": book.name,
-        "author": book.author,
-        "price": book.price,
-        "file_path": book.file_path
-    } for book in books]
+# Stream the whole table as NDJSON or CSV, one chunk per cursor batch
+@app.route('/books/export', methods=['GET'])
+def export_books():
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({"error": "Format must be one of: " + ", ".join(EXPORT_FORMATS)}), 400
 
-    return jsonify(result)
+    headers = {"Content-Disposition": f"attachment; filename=books.{export_format}"}
+    return Response(export_chunks(iter_book_rows(), export_format), mimetype=EXPORT_FORMATS[export_format][2], headers=headers)
+
+# Read a single book
+@app.route('/books/<int:book_id>', methods=['GET'])
+def get_book(book_id):
+    key = book_cache.book_key(book_id)
+    body = book_cache.get(key)
+    if body is None:
+        book = get_db().get(Book, book_id)
+        if not book:
+            return jsonify({"error": "Book not found"}), 404
+        body = app.json.dumps(book_to_dict(book))
+        book_cache.set(key, body)
+    return json_response(body)
 
 # Update a book
 @app.route('/books/<int:book_id>', methods=['PUT'])
 def update_book(book_id):
-    db = next(get_db())
+    db = get_db()
     data = request.form
 
     book = db.query(Book).filter_by(id=book_id).first()
     if not book:
         return jsonify({"error": "Book not found"}), 404
 
+    try:
+        price = float(data.get('price', book.price))
+    except ValueError:
+        return jsonify({"error": "Price must be a valid number"}), 400
+
     book.name = data.get('name', book.name)
     book.author = data.get('author', book.author)
-    book.price = float(data.get('price', book.price))
+    book.price = price
 
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        return jsonify({"error": "Book with the same name and author already exists"}), 400
+    book_cache.invalidate(book_id)
     return jsonify({"message": "Book updated successfully"})
 
 # Delete a book
 @app.route('/books/<int:book_id>', methods=['DELETE'])
 def delete_book(book_id):
-    db = next(get_db())
+    db = get_db()
 
     book = db.query(Book).filter_by(id=book_id).first()
     if not book:
@@ -116,18 +244,27 @@ def delete_book(book_id):
 
     db.delete(book)
     db.commit()
+    book_cache.invalidate(book_id)
     return jsonify({"message": "Book deleted successfully"})
 
 # Download the file associated with a book
 @app.route('/books/<int:book_id>/download', methods=['GET'])
 def download_file(book_id):
-    db = next(get_db())
+    db = get_db()
 
     book = db.query(Book).filter_by(id=book_id).first()
-    if not book or not book.file_path:
+    if not book or not book.file_path or not os.path.isfile(book.file_path):
         return jsonify({"error": "File not found"}), 404
 
-    return send_file(book.file_path, as_attachment=True)
+    # conditional=True answers Range / If-Range with 206 partial content. The file itself goes out through
+    # wsgi.file_wrapper (sendfile under gunicorn and friends) or X-Sendfile, not through Python reads.
+    download_name = secure_filename(book.name) + os.path.splitext(book.file_path)[1]
+    return send_file(os.path.abspath(book.file_path), as_attachment=True, download_name=download_name, conditional=True)
+
+# Connection pool state: checked out connections, overflow and checkout wait times
+@app.route('/metrics/pool', methods=['GET'])
+def get_pool_metrics():
+    return jsonify(pool_metrics())
 
 if __name__ == '__main__':
     create_tables()
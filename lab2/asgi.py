@@ -0,0 +1,328 @@
+import contextlib
+import hashlib
+import json
+import os
+import tempfile
+
+import aiofiles
+import aiofiles.os
+import uvicorn
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from starlette.applications import Starlette
+from starlette.datastructures import UploadFile
+from starlette.responses import FileResponse, JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+from werkzeug.utils import secure_filename
+from cache import BookCache, MemoryCache, NullCache, get_cache
+from database import (DATABASE_URL, MAX_OVERFLOW, POOL_PRE_PING, POOL_RECYCLE, POOL_SIZE, POOL_TIMEOUT, SQL_ECHO,
+                      create_tables, pool_metrics)
+from file_store import CHUNK_SIZE, UPLOAD_FOLDER, content_path
+from models.models import Book
+from queries import (EXPORT_FORMATS, book_to_dict, bulk_chunks, decode_cursor, export_statement, finish_bulk,
+                     keyset_statement, new_file_metadata, next_cursor, offset_statement, parse_ndjson,
+                     parse_price_filter, parse_sort, plan_bulk, record_written, upsert_statement, validate_book_row,
+                     written_ids)
+
+# The same /books API as app.py on an event loop: async database driver, async file I/O, several worker processes.
+# Run with: python asgi.py (ASGI_HOST, ASGI_PORT, ASGI_WORKERS) or uvicorn asgi:app --workers N
+ASGI_HOST = os.getenv("ASGI_HOST", "127.0.0.1")
+ASGI_PORT = int(os.getenv("ASGI_PORT", "8000"))
+# Each worker is its own process with its own BookCache. The in-process MemoryCache is only cleared in the worker
+# that took a write, the others would serve stale pages and ETags for up to BOOK_CACHE_TTL, so with more than one
+# worker the cache must be BOOK_CACHE=redis or it is turned off. Set ASGI_WORKERS to match uvicorn --workers.
+ASGI_WORKERS = int(os.getenv("ASGI_WORKERS", str(os.cpu_count() or 1)))
+
+# DATABASE_URL with its driver swapped for an async one, unless ASYNC_DATABASE_URL says otherwise
+ASYNC_DRIVERS = {
+    'postgresql': 'postgresql+asyncpg',
+    'postgresql+psycopg2': 'postgresql+asyncpg',
+    'sqlite': 'sqlite+aiosqlite'
+}
+
+def async_url(url):
+    scheme, rest = url.split('://', 1)
+    return ASYNC_DRIVERS.get(scheme, scheme) + '://' + rest
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", async_url(DATABASE_URL))
+
+def async_engine_options(url):
+    options = {"echo": SQL_ECHO}
+    if not url.startswith("sqlite"):
+        options.update(
+            pool_size=POOL_SIZE,
+            max_overflow=MAX_OVERFLOW,
+            pool_timeout=POOL_TIMEOUT,
+            pool_pre_ping=POOL_PRE_PING,
+            pool_recycle=POOL_RECYCLE
+        )
+    return options
+
+engine = create_async_engine(ASYNC_DATABASE_URL, **async_engine_options(ASYNC_DATABASE_URL))
+# expire_on_commit=False: attributes stay readable after commit without another (awaited) SELECT
+AsyncSessionLocal = async_sessionmaker(engine, expire_on_commit=False)
+
+os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+
+def worker_cache(workers=ASGI_WORKERS):
+    backend = get_cache()
+    if workers > 1 and isinstance(backend, MemoryCache):
+        print(f"ASGI_WORKERS={workers}: the in-process book cache is not shared between workers, "
+              "caching is off (use BOOK_CACHE=redis)")
+        return NullCache()
+    return backend
+
+book_cache = BookCache(worker_cache())
+
+
+def error(message, status_code):
+    return JSONResponse({"error": message}, status_code=status_code)
+
+def dumps(payload):
+    return json.dumps(payload, sort_keys=True)
+
+# JSON response with an ETag, answers If-None-Match with 304 Not Modified
+def json_response(request, body):
+    etag = '"' + hashlib.md5(body.encode()).hexdigest() + '"'
+    if etag in [tag.strip() for tag in request.headers.get('if-none-match', '').split(',')]:
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(body, media_type='application/json', headers={"ETag": etag})
+
+# Query parameters the way Flask's request.args.get(..., type=...) reads them: bad values fall back to the default
+def query_param(request, name, default=None, type=str):
+    try:
+        return type(request.query_params[name])
+    except (KeyError, ValueError):
+        return default
+
+async def store_upload(upload, folder=UPLOAD_FOLDER):
+    # Same content-addressed layout as file_store.store_upload, written in chunks with aiofiles
+    # so a large upload does not hold up the other requests on this worker's event loop
+    digest = hashlib.sha256()
+    fd, temp_path = tempfile.mkstemp(dir=folder, prefix='.upload-')
+    os.close(fd)
+    try:
+        async with aiofiles.open(temp_path, 'wb') as out:
+            while True:
+                chunk = await upload.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                await out.write(chunk)
+
+        path = content_path(digest.hexdigest(), upload.filename, folder)
+        if await aiofiles.os.path.exists(path):
+            await aiofiles.os.remove(temp_path)
+        else:
+            await aiofiles.os.makedirs(os.path.dirname(path), exist_ok=True)
+            await aiofiles.os.replace(temp_path, path)
+        return path
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+async def create_book(request):
+    form = await request.form()
+    try:
+        values, message = validate_book_row({field: form.get(field) for field in ('name', 'author', 'price')})
+        if message:
+            return error(message, 400)
+
+        async with AsyncSessionLocal() as db:
+            new_book = Book(**values)
+            db.add(new_book)
+            try:
+                await db.flush()
+            except IntegrityError:
+                await db.rollback()
+                return error("Book with the same name and author already exists", 400)
+
+            file = form.get('file')
+            if isinstance(file, UploadFile) and file.filename:
+                new_book.file_path = await store_upload(file)
+                file_size = await aiofiles.os.path.getsize(new_book.file_path)
+                db.add(new_file_metadata(new_book.id, file.filename, file_size))
+            await db.commit()
+    finally:
+        await form.close()
+
+    book_cache.invalidate()
+    return JSONResponse({"message": "Book added successfully", "book": book_to_dict(new_book)}, status_code=201)
+
+async def create_books_bulk(request):
+    body = await request.body()
+    if request.headers.get('content-type', '').split(';')[0] in ('application/x-ndjson', 'application/jsonl'):
+        rows = parse_ndjson(body.splitlines())
+    else:
+        try:
+            rows = json.loads(body)
+        except ValueError:
+            rows = None
+    if not isinstance(rows, list):
+        return error("Body must be a JSON array or NDJSON", 400)
+    update_existing = request.query_params.get('on_conflict', 'ignore') == 'update'
+
+    results, to_write = plan_bulk(rows)
+    async with AsyncSessionLocal() as db:
+        for chunk in bulk_chunks(to_write):
+            written = (await db.execute(upsert_statement(engine.dialect.name, chunk, update_existing))).all()
+            record_written(results, to_write, written, update_existing)
+        await db.commit()
+
+    report = finish_bulk(results, to_write)
+    ids = written_ids(results)
+    if ids:
+        book_cache.invalidate(*ids)
+    return JSONResponse(report)
+
+# Same parameters and responses as GET /books in app.py
+async def get_books(request):
+    limit = query_param(request, 'limit', 5, int)
+    after = request.query_params.get('after')
+    sort = request.query_params.get('sort', 'id')
+    include_files = 'files' in request.query_params.get('include', '').split(',')
+    filters = {
+        'author': request.query_params.get('author'),
+        'name_prefix': request.query_params.get('name_prefix'),
+        'min_price': request.query_params.get('min_price'),
+        'max_price': request.query_params.get('max_price')
+    }
+    try:
+        parse_sort(sort)
+        for name in ('min_price', 'max_price'):
+            filters[name] = parse_price_filter(filters[name], name)
+    except ValueError as e:
+        return error(str(e), 400)
+
+    if after is not None:
+        try:
+            after_id, after_value = decode_cursor(after, sort) if after else (None, None)
+        except ValueError:
+            return error("Invalid cursor", 400)
+
+        key = book_cache.page_key(json.dumps(["after", after_id, after_value, limit, sort, filters, include_files]))
+        body = book_cache.get(key)
+        if body is None:
+            async with AsyncSessionLocal() as db:
+                statement = keyset_statement(after_id, limit, filters, sort, after_value, include_files)
+                books = (await db.scalars(statement)).all()
+            body = dumps({"books": [book_to_dict(book, include_files) for book in books],
+                          "next_cursor": next_cursor(books, limit, sort)})
+            book_cache.set(key, body)
+        return json_response(request, body)
+
+    offset = query_param(request, 'offset', 0, int)
+    key = book_cache.page_key(json.dumps(["offset", offset, limit, sort, filters, include_files]))
+    body = book_cache.get(key)
+    if body is None:
+        async with AsyncSessionLocal() as db:
+            books = (await db.scalars(offset_statement(offset, limit, filters, sort, include_files))).all()
+        body = dumps([book_to_dict(book, include_files) for book in books])
+        book_cache.set(key, body)
+    return json_response(request, body)
+
+async def iter_export(export_format):
+    # Async twin of queries.export_chunks: rows come from a server-side cursor one batch at a time
+    header, format_rows, _ = EXPORT_FORMATS[export_format]
+    if header:
+        yield header
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(export_statement())
+        async for rows in result.partitions():
+            yield format_rows(rows)
+
+async def export_books(request):
+    export_format = request.query_params.get('format', 'ndjson')
+    if export_format not in EXPORT_FORMATS:
+        return error("Format must be one of: " + ", ".join(EXPORT_FORMATS), 400)
+
+    headers = {"Content-Disposition": f"attachment; filename=books.{export_format}"}
+    return StreamingResponse(iter_export(export_format), media_type=EXPORT_FORMATS[export_format][2], headers=headers)
+
+async def get_book(request):
+    book_id = request.path_params['book_id']
+    key = book_cache.book_key(book_id)
+    body = book_cache.get(key)
+    if body is None:
+        async with AsyncSessionLocal() as db:
+            book = await db.get(Book, book_id)
+        if not book:
+            return error("Book not found", 404)
+        body = dumps(book_to_dict(book))
+        book_cache.set(key, body)
+    return json_response(request, body)
+
+async def update_book(request):
+    book_id = request.path_params['book_id']
+    form = await request.form()
+    async with AsyncSessionLocal() as db:
+        book = await db.get(Book, book_id)
+        if not book:
+            return error("Book not found", 404)
+
+        try:
+            price = float(form.get('price', book.price))
+        except ValueError:
+            return error("Price must be a valid number", 400)
+
+        book.name = form.get('name', book.name)
+        book.author = form.get('author', book.author)
+        book.price = price
+
+        try:
+            await db.commit()
+        except IntegrityError:
+            await db.rollback()
+            return error("Book with the same name and author already exists", 400)
+    book_cache.invalidate(book_id)
+    return JSONResponse({"message": "Book updated successfully"})
+
+async def delete_book(request):
+    book_id = request.path_params['book_id']
+    async with AsyncSessionLocal() as db:
+        book = await db.get(Book, book_id)
+        if not book:
+            return error("Book not found", 404)
+
+        await db.delete(book)
+        await db.commit()
+    book_cache.invalidate(book_id)
+    return JSONResponse({"message": "Book deleted successfully"})
+
+async def download_file(request):
+    async with AsyncSessionLocal() as db:
+        book = await db.get(Book, request.path_params['book_id'])
+    if not book or not book.file_path or not await aiofiles.os.path.isfile(book.file_path):
+        return error("File not found", 404)
+
+    # FileResponse answers Range requests and hands the file to the server's pathsend/sendfile path when it has one
+    download_name = secure_filename(book.name) + os.path.splitext(book.file_path)[1]
+    return FileResponse(os.path.abspath(book.file_path), filename=download_name)
+
+async def get_pool_metrics(request):
+    return JSONResponse(pool_metrics(engine.sync_engine))
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    yield
+    await engine.dispose()
+
+app = Starlette(routes=[
+    Route('/books', get_books, methods=['GET']),
+    Route('/books', create_book, methods=['POST']),
+    Route('/books/bulk', create_books_bulk, methods=['POST']),
+    Route('/books/export', export_books, methods=['GET']),
+    Route('/books/{book_id:int}', get_book, methods=['GET']),
+    Route('/books/{book_id:int}', update_book, methods=['PUT']),
+    Route('/books/{book_id:int}', delete_book, methods=['DELETE']),
+    Route('/books/{book_id:int}/download', download_file, methods=['GET']),
+    Route('/metrics/pool', get_pool_metrics, methods=['GET']),
+], lifespan=lifespan)
+
+if __name__ == '__main__':
+    # Tables are created once here, not by every worker process
+    create_tables()
+    uvicorn.run("asgi:app", host=ASGI_HOST, port=ASGI_PORT, workers=ASGI_WORKERS)
@@ -0,0 +1,101 @@
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import requests
+
+# Usage: python bench_asgi.py [clients] [seconds] [asgi_workers]
+# Starts the Flask dev server (the current WSGI path) and asgi.py under uvicorn on the same database,
+# drives both with the same mix of GET /books pages and single-book lookups, reports requests/sec and latency.
+# Uses a throwaway SQLite database as a stand-in for Postgres unless DATABASE_URL is already set.
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench_asgi.db")
+
+ROW_COUNT = 10000
+WSGI_PORT = 8801
+ASGI_PORT = 8802
+LAB2_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def wait_for_port(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"server on port {port} did not start")
+
+
+def start_server(command, port, extra_env):
+    env = dict(os.environ, BOOK_CACHE="off", **extra_env)  # Every request has to reach the database
+    server = subprocess.Popen(command, cwd=LAB2_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    wait_for_port(port)
+    return server
+
+
+def client(base_url, seconds, seed):
+    # One keep-alive connection issuing requests back to back, returns the latency of each one
+    random.seed(seed)
+    session = requests.Session()
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        if random.random() < 0.5:
+            url = f"{base_url}/books?limit=20&offset={random.randrange(ROW_COUNT - 20)}"
+        else:
+            url = f"{base_url}/books/{random.randint(1, ROW_COUNT)}"
+        start = time.perf_counter()
+        response = session.get(url)
+        latencies.append(time.perf_counter() - start)
+        errors += response.status_code != 200
+    return latencies, errors
+
+
+def run_load(base_url, clients, seconds):
+    # Client processes, not threads, so the load generator is not held back by one GIL
+    with ProcessPoolExecutor(max_workers=clients) as executor:
+        futures = [executor.submit(client, base_url, seconds, seed) for seed in range(clients)]
+        results = [future.result() for future in futures]
+    latencies = sorted(latency for result, _ in results for latency in result)
+    errors = sum(error_count for _, error_count in results)
+    return len(latencies) / seconds, latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.99)], errors
+
+
+def main():
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 10
+    asgi_workers = sys.argv[3] if len(sys.argv) > 3 else str(os.cpu_count() or 1)
+
+    sys.path.insert(0, LAB2_DIR)
+    from bench_pagination import seed
+    from database import engine
+    engine.echo = False
+    seed(ROW_COUNT)
+
+    servers = [
+        ("WSGI (Flask dev server)", [sys.executable, "-c", f"from app import app; app.run(port={WSGI_PORT})"], WSGI_PORT, {}),
+        (f"ASGI (uvicorn, {asgi_workers} workers)", [sys.executable, "asgi.py"], ASGI_PORT,
+         {"ASGI_PORT": str(ASGI_PORT), "ASGI_WORKERS": asgi_workers}),
+    ]
+    print(f"{clients} clients, {seconds:.0f} s each, {ROW_COUNT} books, {engine.dialect.name}")
+    print(f"{'':34}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for label, command, port, extra_env in servers:
+        server = start_server(command, port, extra_env)
+        try:
+            requests_per_second, p50, p99, errors = run_load(f"http://127.0.0.1:{port}", clients, seconds)
+        finally:
+            server.terminate()
+            server.wait()
+        print(f"{label:34}{requests_per_second:>10.0f}{p50 * 1000:>10.2f}{p99 * 1000:>10.2f}{errors:>8}")
+
+
+if __name__ == "__main__":
+    main()
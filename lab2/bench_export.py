@@ -0,0 +1,56 @@
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# Usage: python bench_export.py [number_of_rows]
+# Uses a throwaway SQLite database as a stand-in for Postgres unless DATABASE_URL is already set.
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench_export.db")
+
+from app import iter_book_rows
+from queries import EXPORT_COLUMNS, book_to_dict, export_chunks
+from bench_pagination import seed
+from database import SessionLocal, engine
+from models.models import Book
+
+
+def export_all():
+    # What an export looked like before: load every row, then build the body
+    with SessionLocal() as db:
+        books = db.query(Book).order_by(Book.id).all()
+        yield "".join(json.dumps(book_to_dict(book)) + "\n" for book in books)
+
+
+def measure(chunks):
+    # Time to first chunk, total time, bytes produced and peak traced memory
+    tracemalloc.start()
+    start = time.perf_counter()
+    first_chunk = None
+    size = 0
+    for chunk in chunks:
+        if first_chunk is None:
+            first_chunk = time.perf_counter() - start
+        size += len(chunk)
+    total = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return first_chunk, total, size, peak
+
+
+def main():
+    row_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    engine.echo = False
+    seed(row_count)
+
+    print(f"{row_count} rows, columns {', '.join(EXPORT_COLUMNS)}, {engine.dialect.name}")
+    print(f"{'':10}{'first chunk ms':>16}{'total ms':>12}{'MB out':>10}{'peak MB':>10}")
+    for label, chunks in (("all()", export_all()), ("streamed", export_chunks(iter_book_rows(), "ndjson"))):
+        first_chunk, total, size, peak = measure(chunks)
+        print(f"{label:10}{first_chunk * 1000:>16.1f}{total * 1000:>12.1f}{size / 2 ** 20:>10.1f}{peak / 2 ** 20:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
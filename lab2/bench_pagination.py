@@ -0,0 +1,61 @@
+import os
+import sys
+import tempfile
+import time
+
+# Usage: python bench_pagination.py [number_of_rows] [page_size]
+# Uses a throwaway SQLite database as a stand-in for Postgres unless DATABASE_URL is already set.
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench_pagination.db")
+
+from app import offset_page, keyset_page
+from database import SessionLocal, engine, create_tables
+from models.models import Book
+
+ROUNDS = 20
+
+
+def seed(row_count):
+    create_tables()
+    with engine.begin() as connection:
+        if connection.execute(Book.__table__.select().limit(1)).first():
+            return
+        batch = []
+        for i in range(1, row_count + 1):
+            batch.append({"id": i, "name": f"Book {i}", "author": f"Author {i % 1000}", "price": i % 100 + 0.99})
+            if len(batch) == 10000:
+                connection.execute(Book.__table__.insert(), batch)
+                batch = []
+        if batch:
+            connection.execute(Book.__table__.insert(), batch)
+
+
+def timed_page(fetch_page, *args):
+    with SessionLocal() as db:
+        start = time.perf_counter()
+        for _ in range(ROUNDS):
+            books = fetch_page(db, *args)
+            db.expunge_all()
+        return (time.perf_counter() - start) / ROUNDS * 1000, [book.id for book in books]
+
+
+def main():
+    row_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    page_size = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    engine.echo = False
+    seed(row_count)
+
+    deep_page = min(10000, row_count // page_size - 1)
+    print(f"{row_count} rows, page size {page_size}, {engine.dialect.name}")
+    print(f"{'page':>8}{'offset ms':>12}{'keyset ms':>12}")
+    for page in (1, deep_page // 10, deep_page):
+        # Ids are seeded 1..N, so the cursor for a page is the last id of the previous one
+        offset = (page - 1) * page_size
+        offset_ms, offset_ids = timed_page(offset_page, offset, page_size)
+        keyset_ms, keyset_ids = timed_page(keyset_page, offset or None, page_size)
+        assert offset_ids == keyset_ids
+        print(f"{page:>8}{offset_ms:>12.3f}{keyset_ms:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+BOOK_CACHE = os.getenv("BOOK_CACHE", "memory")  # memory, redis or off
+BOOK_CACHE_TTL = int(os.getenv("BOOK_CACHE_TTL", "60"))
+BOOK_CACHE_MAX_ENTRIES = int(os.getenv("BOOK_CACHE_MAX_ENTRIES", "1024"))
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+
+class MemoryCache:
+    # In-process LRU with a TTL per entry. Counters live outside the LRU so they are never evicted.
+    def __init__(self, ttl=BOOK_CACHE_TTL, max_entries=BOOK_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.counters = {}
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def delete(self, *keys):
+        with self.lock:
+            for key in keys:
+                self.entries.pop(key, None)
+
+    def counter(self, key):
+        with self.lock:
+            return self.counters.get(key, 0)
+
+    def incr(self, key):
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + 1
+            return self.counters[key]
+
+
+class RedisCache:
+    # Same interface on top of any client with Redis' get/set/delete/incr, shared between app processes
+    def __init__(self, client, ttl=BOOK_CACHE_TTL, prefix="lab2:"):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        return value.decode() if isinstance(value, bytes) else value
+
+    def set(self, key, value):
+        self.client.set(self.prefix + key, value, ex=self.ttl)
+
+    def delete(self, *keys):
+        if keys:
+            self.client.delete(*[self.prefix + key for key in keys])
+
+    def counter(self, key):
+        return int(self.client.get(self.prefix + key) or 0)
+
+    def incr(self, key):
+        return self.client.incr(self.prefix + key)
+
+
+class NullCache:
+    # Caching switched off: every lookup misses
+    def get(self, key):
+        return None
+
+    def set(self, key, value):
+        pass
+
+    def delete(self, *keys):
+        pass
+
+    def counter(self, key):
+        return 0
+
+    def incr(self, key):
+        return 0
+
+
+def get_cache(name=BOOK_CACHE):
+    if name == "redis":
+        try:
+            import redis
+        except ImportError:
+            print("BOOK_CACHE=redis needs the redis package, falling back to the in-process cache")
+            return MemoryCache()
+        return RedisCache(redis.Redis.from_url(REDIS_URL))
+    if name == "off":
+        return NullCache()
+    return MemoryCache()
+
+
+class BookCache:
+    # Cached JSON bodies for GET /books pages and single books.
+    # Single books are keyed by id and dropped on write. Pages are keyed by a generation number:
+    # any write bumps it, so every page cached before the write is never looked up again.
+    def __init__(self, backend):
+        self.backend = backend
+
+    def page_key(self, *params):
+        generation = self.backend.counter("books:generation")
+        return f"books:{generation}:" + ":".join(str(param) for param in params)
+
+    def book_key(self, book_id):
+        return f"book:{book_id}"
+
+    def get(self, key):
+        return self.backend.get(key)
+
+    def set(self, key, body):
+        self.backend.set(key, body)
+
+    def invalidate(self, *book_ids):
+        # Call after commit. A reader that loaded a row just before the commit can still put it
+        # back under its id; that entry lives at most one TTL.
+        self.backend.delete(*[self.book_key(book_id) for book_id in book_ids])
+        self.backend.incr("books:generation")
@@ -0,0 +1,101 @@
+import os
+import sys
+import tempfile
+from datetime import datetime
+
+# Usage: python check_query_counts.py
+# Counts the SQL statements behind get_all_books_with_files() and GET /books?include=files
+# for growing numbers of books: the count has to stay the same, not grow with the rows.
+# Each part gets a throwaway SQLite database (the two Book models map different books tables).
+BOOK_COUNTS = (10, 100, 2000)
+
+
+def sqlite_url(name):
+    return "sqlite:///" + os.path.join(tempfile.mkdtemp(), name)
+
+
+def count_statements(engine, function):
+    from sqlalchemy import event
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        result = function()
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+    return len(statements), result
+
+
+def seed(engine, books_table, files_table, start, count, link=False):
+    # Every other book gets a file
+    books = []
+    files = []
+    for i in range(start, start + count):
+        book = {"id": i, "name": f"Book {i}", "author": "Author", "price": 1.0}
+        if link:
+            book["link"] = f"book-{i}"
+        books.append(book)
+        if i % 2 == 0:
+            files.append({"filename": f"file-{i}.pdf", "upload_time": datetime(2024, 1, 1), "file_size": i, "book_id": i})
+    with engine.begin() as connection:
+        connection.execute(books_table.insert(), books)
+        if files:
+            connection.execute(files_table.insert(), files)
+
+
+def check_ex2():
+    os.environ["DATABASE_URL"] = sqlite_url("ex2.db")
+    import create_table_ex2 as ex2
+
+    counts = []
+    seeded = 0
+    for total in BOOK_COUNTS:
+        seed(ex2.engine, ex2.Book.__table__, ex2.FileMetadata.__table__, seeded + 1, total - seeded, link=True)
+        seeded = total
+        statements, books = count_statements(ex2.engine, ex2.get_all_books_with_files)
+        assert len(books) == total
+        assert sum(book["file_metadata"] is not None for book in books) == total // 2
+        counts.append(statements)
+        print(f"get_all_books_with_files, {total:5} books: {statements} statement(s)")
+    return counts
+
+
+def check_app():
+    os.environ["DATABASE_URL"] = sqlite_url("app.db")
+    from app import app, book_cache
+    from cache import NullCache
+    from database import engine, create_tables
+    from models.models import Book, FileMetadata
+
+    book_cache.backend = NullCache()  # Every request has to reach the database
+    create_tables()
+    client = app.test_client()
+    seed(engine, Book.__table__, FileMetadata.__table__, 1, max(BOOK_COUNTS))
+
+    counts = []
+    for limit in BOOK_COUNTS:
+        statements, response = count_statements(engine, lambda: client.get(f"/books?include=files&limit={limit}"))
+        books = response.get_json()
+        assert len(books) == limit
+        assert sum(book["file_metadata"] is not None for book in books) == limit // 2
+        counts.append(statements)
+        print(f"GET /books?include=files, {limit:5} books: {statements} statement(s)")
+    return counts
+
+
+def main():
+    failed = []
+    for label, counts in (("get_all_books_with_files", check_ex2()), ("GET /books?include=files", check_app())):
+        if len(set(counts)) != 1:
+            failed.append(label)
+    if failed:
+        print("query count grows with the number of books in: " + ", ".join(failed))
+        sys.exit(1)
+    print("ok")
+
+
+if __name__ == "__main__":
+    main()
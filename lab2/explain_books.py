@@ -0,0 +1,77 @@
+import os
+import sys
+import tempfile
+
+# Usage: python explain_books.py [number_of_rows]
+# Prints the plan of every GET /books filter and sort and fails if one of them reads the whole table.
+# Uses a throwaway SQLite database as a stand-in for Postgres unless DATABASE_URL is already set.
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "explain_books.db")
+
+from sqlalchemy import text
+from app import offset_page
+from queries import keyset_statement, offset_statement
+from bench_pagination import seed
+from database import SessionLocal, engine
+
+LIMIT = 20
+
+# (label, filters, sort, keyset seek after (id, value) or None)
+QUERIES = [
+    ("author", {"author": "Author 7"}, "id", None),
+    ("name prefix", {"name_prefix": "Book 12"}, "id", None),
+    ("price range", {"min_price": 10, "max_price": 12}, "price", None),
+    ("sort by -price, next page", {}, "-price", (500, 99.99)),
+    ("sort by name, next page", {}, "name", (500, "Book 1234")),
+    ("author, next page", {"author": "Author 7"}, "id", (5007, None)),
+]
+
+
+def page_statement(filters, sort, after):
+    # The statement offset_page / keyset_page run for these parameters
+    if after is None:
+        return offset_statement(0, LIMIT, filters, sort)
+    return keyset_statement(after[0], LIMIT, filters, sort, after[1])
+
+
+def explain(db, statement):
+    sql = str(statement.compile(engine, compile_kwargs={"literal_binds": True}))
+    if engine.dialect.name == "postgresql":
+        # psycopg2's paramstyle doubles '%' in compiled literals, text() without parameters would keep both
+        plan = [row[0] for row in db.execute(text("EXPLAIN " + sql.replace("%%", "%")))]
+        full_scan = any("Seq Scan on books" in line for line in plan)
+    else:
+        plan = [row[-1] for row in db.execute(text("EXPLAIN QUERY PLAN " + sql))]
+        full_scan = any(line.strip() == "SCAN books" for line in plan)
+    return plan, full_scan
+
+
+def main():
+    row_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    engine.echo = False
+    seed(row_count)
+    with SessionLocal() as db:
+        if engine.dialect.name == "sqlite":
+            # Postgres' LIKE is case-sensitive; SQLite only uses an index for LIKE 'prefix%' when its LIKE is too
+            db.execute(text("PRAGMA case_sensitive_like = ON"))
+        db.execute(text("ANALYZE"))
+        failed = []
+        for label, filters, sort, after in QUERIES:
+            plan, full_scan = explain(db, page_statement(filters, sort, after))
+            print(f"{label}:")
+            for line in plan:
+                print("    " + line)
+            if full_scan:
+                failed.append(label)
+        # The plans are only worth something if the queries still return the right rows
+        assert [book.author for book in offset_page(db, 0, LIMIT, {"author": "Author 7"})] == ["Author 7"] * LIMIT
+        assert all(book.name.startswith("Book 12") for book in offset_page(db, 0, LIMIT, {"name_prefix": "Book 12"}))
+
+    if failed:
+        print("full table scan in: " + ", ".join(failed))
+        sys.exit(1)
+    print("ok, every query uses an index")
+
+
+if __name__ == "__main__":
+    main()
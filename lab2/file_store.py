@@ -0,0 +1,71 @@
+import hashlib
+import os
+import shutil
+import tempfile
+
+from flask import Request
+from werkzeug.utils import secure_filename
+
+UPLOAD_FOLDER = 'uploads'
+CHUNK_SIZE = 1024 * 1024
+
+
+class HashingFile:
+    # Spool file for one uploaded part. The form parser writes the part into it chunk by chunk,
+    # the sha256 is computed on the way, and the finished file is renamed instead of copied.
+    def __init__(self, folder=UPLOAD_FOLDER):
+        self.file = tempfile.NamedTemporaryFile(dir=folder, prefix='.upload-', delete=False)
+        self.digest = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data):
+        self.digest.update(data)
+        self.size += len(data)
+        return self.file.write(data)
+
+    def discard(self):
+        self.file.close()
+        if os.path.exists(self.file.name):
+            os.remove(self.file.name)
+
+    def __getattr__(self, name):
+        return getattr(self.file, name)
+
+
+class UploadRequest(Request):
+    # Uploaded files go straight to disk in UPLOAD_FOLDER, whatever their size, never into memory
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        spool = HashingFile()
+        self.upload_spools = getattr(self, 'upload_spools', []) + [spool]
+        return spool
+
+
+def content_path(digest, filename, folder=UPLOAD_FOLDER):
+    # uploads/ab/ab12...ef.pdf: named by content, two-level fan-out, original extension kept for downloads
+    extension = os.path.splitext(secure_filename(filename or ''))[1].lower()
+    return os.path.join(folder, digest[:2], digest + extension)
+
+
+def store_upload(file_storage, folder=UPLOAD_FOLDER):
+    # Moves an uploaded file to its content-addressed path and returns (path, sha256).
+    # A file with the same content already on disk is reused and the new copy dropped.
+    spool = file_storage.stream
+    if not isinstance(spool, HashingFile):
+        spool = HashingFile(folder)
+        shutil.copyfileobj(file_storage.stream, spool, CHUNK_SIZE)
+    spool.file.close()
+
+    digest = spool.digest.hexdigest()
+    path = content_path(digest, file_storage.filename, folder)
+    if os.path.exists(path):
+        spool.discard()
+    else:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(spool.file.name, path)
+    return path, digest
+
+
+def discard_uploads(request):
+    # Spools that were never stored (validation error, duplicate book, ...) are removed after the request
+    for spool in getattr(request, 'upload_spools', []):
+        spool.discard()
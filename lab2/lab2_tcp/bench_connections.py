@@ -0,0 +1,119 @@
+import asyncio
+import os
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+# Usage: python bench_connections.py [client_counts] [reads_per_client]
+#   e.g. python bench_connections.py 1000,10000 5
+# Starts server.py in each mode as a separate process, opens that many connections at once and keeps them open,
+# then every connection sends reads. Reports server memory, thread count and read latency per mode.
+PORT = 65520
+CONNECT_CONCURRENCY = 500  # Connections being opened at the same time, keeps the SYN queue from overflowing
+FILE_CONTENT = b"Data written at startup by bench_connections\n"
+SERVER_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def raise_file_limit():
+    # Every connection is a file descriptor on both sides; the server process inherits this limit
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    return hard
+
+
+def process_status(pid):
+    # VmRSS: resident memory now, VmHWM: peak resident memory, Threads: OS threads
+    status = {}
+    with open(f"/proc/{pid}/status") as file:
+        for line in file:
+            key, _, value = line.partition(":")
+            status[key] = value.split()[0] if value.split() else ""
+    return int(status["VmRSS"]) / 1024, int(status["VmHWM"]) / 1024, int(status["Threads"])
+
+
+def start_server(mode):
+    work_dir = tempfile.mkdtemp()
+    with open(os.path.join(work_dir, "shared_file.txt"), "wb") as file:
+        file.write(FILE_CONTENT)
+    command = [sys.executable, "-c", f"import server; server.SERVERS['{mode}'](port={PORT}).start()"]
+    env = dict(os.environ, PYTHONPATH=SERVER_DIR, TCP_VERBOSE="0", WRITE_DELAY="0")
+    server = subprocess.Popen(command, cwd=work_dir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while True:
+        try:
+            socket.create_connection(("127.0.0.1", PORT), timeout=1).close()
+            return server
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.1)
+
+
+async def open_connections(count):
+    semaphore = asyncio.Semaphore(CONNECT_CONCURRENCY)
+
+    async def connect():
+        async with semaphore:
+            return await asyncio.open_connection("127.0.0.1", PORT)
+
+    return await asyncio.gather(*[connect() for _ in range(count)])
+
+
+async def read_many(connection, reads, latencies):
+    reader, writer = connection
+    for _ in range(reads):
+        start = time.perf_counter()
+        writer.write(b"read")
+        await writer.drain()
+        await reader.readexactly(len(FILE_CONTENT))
+        latencies.append(time.perf_counter() - start)
+
+
+async def run(mode, clients, reads):
+    server = start_server(mode)
+    try:
+        start = time.perf_counter()
+        connections = await open_connections(clients)
+        connect_time = time.perf_counter() - start
+        await asyncio.sleep(0.5)  # Let the server finish accepting
+        idle_rss, _, threads = process_status(server.pid)
+
+        latencies = []
+        start = time.perf_counter()
+        await asyncio.gather(*[read_many(connection, reads, latencies) for connection in connections])
+        elapsed = time.perf_counter() - start
+        _, peak_rss, _ = process_status(server.pid)
+
+        for _, writer in connections:
+            writer.close()
+        latencies.sort()
+        return (connect_time, idle_rss, peak_rss, threads, len(latencies) / elapsed,
+                latencies[len(latencies) // 2] * 1000, latencies[int(len(latencies) * 0.99)] * 1000)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    client_counts = [int(count) for count in (sys.argv[1] if len(sys.argv) > 1 else "1000,10000").split(",")]
+    reads = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    limit = raise_file_limit()
+    print(f"{reads} reads per client, file descriptor limit {limit}")
+    print(f"{'mode':>8}{'clients':>9}{'connect s':>11}{'RSS MB':>9}{'peak MB':>9}{'threads':>9}{'reads/s':>10}{'p50 ms':>9}{'p99 ms':>9}")
+    for clients in client_counts:
+        for mode in ("threads", "asyncio"):
+            try:
+                result = asyncio.run(run(mode, clients, reads))
+            except OSError as e:
+                print(f"{mode:>8}{clients:>9}  failed: {e}")
+                continue
+            connect_time, idle_rss, peak_rss, threads, rate, p50, p99 = result
+            print(f"{mode:>8}{clients:>9}{connect_time:>11.2f}{idle_rss:>9.1f}{peak_rss:>9.1f}{threads:>9}"
+                  f"{rate:>10.0f}{p50:>9.2f}{p99:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from client import FramedClient
+
+# Usage: python bench_group_commit.py [clients] [writes_per_client] [server_mode]
+# Starts server.py as a separate process for every durability setting, once with group commit and once
+# with batches of one record (every write appended and synced on its own), and has client threads issue
+# writes concurrently. Reports writes/sec and write latency. No simulated write delay, the disk is the cost.
+PORT = 65440
+SERVER_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def start_server(port, mode, env):
+    file_path = os.path.join(tempfile.mkdtemp(dir=SERVER_DIR), "shared_file.txt")
+    command = [sys.executable, "-c",
+               f"import server; server.SERVERS['{mode}'](port={port}, file_path={file_path!r}, verbose=False).start()"]
+    env = dict(os.environ, WRITE_DELAY="0", **env)
+    server = subprocess.Popen(command, cwd=SERVER_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while True:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return server, file_path
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.1)
+
+
+def run_clients(port, clients, writes):
+    latencies = []
+    lock = threading.Lock()
+
+    def client():
+        with FramedClient(port=port) as connection:
+            for _ in range(writes):
+                start = time.perf_counter()
+                connection.request("write")
+                elapsed = time.perf_counter() - start
+                with lock:
+                    latencies.append(elapsed)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return len(latencies) / (time.perf_counter() - start), sorted(latencies)
+
+
+def main():
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    writes = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    mode = sys.argv[3] if len(sys.argv) > 3 else "threads"
+
+    print(f"{clients} clients x {writes} writes, {mode} server")
+    print(f"{'durability':12}{'batching':>10}{'writes/s':>10}{'p50 ms':>9}{'p99 ms':>9}")
+    port = PORT
+    for durability in ("none", "batch", "write"):
+        for label, max_batch in (("one", "1"), ("group", os.getenv("GROUP_COMMIT_MAX", "256"))):
+            server, file_path = start_server(port, mode, {"DURABILITY": durability, "GROUP_COMMIT_MAX": max_batch})
+            try:
+                rate, latencies = run_clients(port, clients, writes)
+            finally:
+                server.terminate()
+                server.wait()
+                os.remove(file_path)
+                os.rmdir(os.path.dirname(file_path))
+            port += 1
+            print(f"{durability:12}{label:>10}{rate:>10.0f}{latencies[len(latencies) // 2] * 1000:>9.2f}"
+                  f"{latencies[int(len(latencies) * 0.99)] * 1000:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from client import FramedClient, send_command
+
+# Usage: python bench_pipeline.py [clients] [commands_per_client] [depth]
+# Starts server.py in each mode as a separate process and has client threads issue reads three ways:
+# the text protocol with a connection per command, framed one command at a time on a kept-open
+# connection, and framed with up to depth commands in flight. Reports commands per second.
+PORT = 65530
+FILE_CONTENT = b"Data written at startup by bench_pipeline\n" * 4
+SERVER_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def start_server(mode, port):
+    file_path = os.path.join(tempfile.mkdtemp(), "shared_file.txt")
+    with open(file_path, "wb") as file:
+        file.write(FILE_CONTENT)
+    command = [sys.executable, "-c",
+               f"import server; server.SERVERS['{mode}'](port={port}, file_path={file_path!r}, verbose=False).start()"]
+    server = subprocess.Popen(command, cwd=SERVER_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while True:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return server
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.1)
+
+
+def text_per_connection(port, commands, depth):
+    for _ in range(commands):
+        send_command("read", port=port)
+
+
+def framed_one_at_a_time(port, commands, depth):
+    with FramedClient(port=port) as client:
+        for _ in range(commands):
+            client.request("read")
+
+
+def framed_pipelined(port, commands, depth):
+    with FramedClient(port=port) as client:
+        client.pipeline(["read"] * commands, depth)
+
+
+def run_clients(target, port, clients, commands, depth):
+    threads = [threading.Thread(target=target, args=(port, commands, depth)) for _ in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return clients * commands / (time.perf_counter() - start)
+
+
+def main():
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    commands = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    depth = int(sys.argv[3]) if len(sys.argv) > 3 else 16
+
+    runs = [
+        ("text, connection per command", text_per_connection),
+        ("framed, one at a time", framed_one_at_a_time),
+        (f"framed, pipelined x{depth}", framed_pipelined),
+    ]
+    print(f"{clients} clients x {commands} reads of {len(FILE_CONTENT)} bytes")
+    print(f"{'':32}{'threads cmd/s':>15}{'asyncio cmd/s':>15}")
+    rates = {}
+    for offset, mode in enumerate(("threads", "asyncio")):
+        server = start_server(mode, PORT + offset)
+        try:
+            for label, target in runs:
+                rates[label, mode] = run_clients(target, PORT + offset, clients, commands, depth)
+        finally:
+            server.terminate()
+            server.wait()
+    for label, _ in runs:
+        print(f"{label:32}{rates[label, 'threads']:>15.0f}{rates[label, 'asyncio']:>15.0f}")
+
+
+if __name__ == "__main__":
+    main()
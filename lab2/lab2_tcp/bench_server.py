@@ -0,0 +1,71 @@
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+from client import send_command
+from server import TCPServer
+
+# Usage: python bench_server.py [clients] [commands_per_client] [write_ratio] [write_delay]
+# Runs the server in this process on a throwaway file and lets hundreds of client threads fire
+# read/write commands at it, once with writer priority and once without.
+PORT = 65499
+
+
+def run_clients(port, clients, commands, write_ratio):
+    read_latencies = []
+    write_latencies = []
+    failed_reads = []
+    lock = threading.Lock()
+
+    def client(seed):
+        rng = random.Random(seed)
+        for _ in range(commands):
+            command = "write" if rng.random() < write_ratio else "read"
+            start = time.perf_counter()
+            response = send_command(command, port=port)
+            elapsed = time.perf_counter() - start
+            with lock:
+                if command == "write":
+                    write_latencies.append(elapsed)
+                else:
+                    read_latencies.append(elapsed)
+                    if "try again later" in response:
+                        failed_reads.append(response)
+
+    threads = [threading.Thread(target=client, args=(seed,)) for seed in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start, sorted(read_latencies), sorted(write_latencies), len(failed_reads)
+
+
+def percentile(latencies, fraction):
+    return latencies[int(len(latencies) * fraction)] * 1000 if latencies else 0.0
+
+
+def main():
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    commands = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    write_ratio = float(sys.argv[3]) if len(sys.argv) > 3 else 0.05
+    delay = sys.argv[4] if len(sys.argv) > 4 else "0.005"
+
+    print(f"{clients} clients x {commands} commands, {write_ratio:.0%} writes, write delay {delay} s")
+    print(f"{'':16}{'cmd/s':>9}{'read p50':>10}{'read p99':>10}{'write p50':>11}{'write p99':>11}{'failed':>8}")
+    for port, prefer_writers in ((PORT, True), (PORT + 1, False)):
+        tcp_server = TCPServer(port=port, file_path=os.path.join(tempfile.mkdtemp(), "shared_file.txt"),
+                               prefer_writers=prefer_writers, write_delay=delay, verbose=False)
+        threading.Thread(target=tcp_server.start, daemon=True).start()
+        elapsed, reads, writes, failed = run_clients(port, clients, commands, write_ratio)
+        label = "prefer writers" if prefer_writers else "prefer readers"
+        print(f"{label:16}{(len(reads) + len(writes)) / elapsed:>9.0f}{percentile(reads, 0.5):>10.1f}"
+              f"{percentile(reads, 0.99):>10.1f}{percentile(writes, 0.5):>11.1f}{percentile(writes, 0.99):>11.1f}{failed:>8}")
+    print("(latencies in ms; failed = reads answered with 'try again later', which the old server did during every write)")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,12 +2,92 @@ import socket
 import threading
 import time
 
-def client_task(command):
+from protocol import CHUNK, END, REQUEST, encode_frame, read_frame
+
+HOST = '127.0.0.1'
+PORT = 65432
+
+def send_command(command, host=HOST, port=PORT):
+    # One command per connection. Closing our side tells the server we are done,
+    # so the whole response can be read up to EOF however long the file has grown.
     with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
-        sock.connect(('127.0.0.1', 65432))
+        sock.connect((host, port))
         sock.sendall(command.encode('utf-8'))
-        response = sock.recv(1024)
-        print(f"Server response to '{command}': {response.decode('utf-8')}\n")
+        sock.shutdown(socket.SHUT_WR)
+        chunks = []
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+        return b"".join(chunks).decode('utf-8')
+
+class FramedClient:
+    # One connection speaking the framed protocol. send() does not wait for the answer, so several
+    # commands can be in flight; receive() returns the next complete response and the id it belongs to.
+    def __init__(self, host=HOST, port=PORT):
+        self.sock = socket.create_connection((host, port))
+        self.next_id = 0
+        self.partial = {}  # request id -> chunks of a response still being streamed
+
+    def send(self, *commands):
+        request_ids = list(range(self.next_id, self.next_id + len(commands)))
+        self.next_id += len(commands)
+        # All frames in one sendall, a pipelined batch costs one system call
+        self.sock.sendall(b"".join(encode_frame(REQUEST, request_id, command.encode('utf-8'))
+                                   for request_id, command in zip(request_ids, commands)))
+        return request_ids
+
+    def receive(self):
+        while True:
+            frame = read_frame(self.sock)
+            if frame is None:
+                raise ConnectionError("Server closed the connection")
+            kind, request_id, payload = frame
+            if kind == CHUNK:
+                self.partial.setdefault(request_id, []).append(payload)
+            elif kind == END:
+                chunks = self.partial.pop(request_id, [])
+                chunks.append(payload)
+                return request_id, b"".join(chunks).decode('utf-8')
+
+    def request(self, command):
+        # One command, wait for its answer
+        request_id, = self.send(command)
+        while True:
+            response_id, response = self.receive()
+            if response_id == request_id:
+                return response
+
+    def pipeline(self, commands, depth=16):
+        # Keeps up to depth commands in flight, returns the responses in the order of commands.
+        # The window keeps both sides from filling their socket buffers and blocking on each other.
+        commands = list(commands)
+        responses = {}
+        sent = self.send(*commands[:depth])
+        index_of = {request_id: index for index, request_id in enumerate(sent)}
+        next_index = len(sent)
+        while len(responses) < len(commands):
+            request_id, response = self.receive()
+            responses[index_of.pop(request_id)] = response
+            if next_index < len(commands):
+                new_id, = self.send(commands[next_index])
+                index_of[new_id] = next_index
+                next_index += 1
+        return [responses[index] for index in range(len(commands))]
+
+    def close(self):
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def client_task(command):
+    response = send_command(command)
+    print(f"Server response to '{command}': {response}\n")
 
 if __name__ == "__main__":
     time.sleep(1)
@@ -21,3 +101,8 @@ if __name__ == "__main__":
 
     for t in client_threads:
         t.join()
+
+    # The same commands pipelined over one framed connection
+    with FramedClient() as client:
+        for command, response in zip(client_commands, client.pipeline(client_commands)):
+            print(f"Pipelined response to '{command}': {response}\n")
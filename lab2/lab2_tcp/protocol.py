@@ -0,0 +1,77 @@
+import struct
+
+# Framed protocol: every message is a 10-byte header followed by its payload.
+#   magic (1 byte) | kind (1 byte) | request id (4 bytes) | payload length (4 bytes), network byte order
+# The client picks the request id; every frame of the response carries it, so several commands can be
+# in flight on one connection. A response is zero or more CHUNK frames followed by one END frame.
+# The magic byte is not printable text, so the server tells a framed client from a legacy one
+# ("read", "write", "exit" as plain text) by the first byte it sends.
+MAGIC = b"\xfb"
+HEADER = struct.Struct("!cBII")
+
+REQUEST = 1  # Payload: the command text
+CHUNK = 2    # Part of a response, more follows
+END = 3      # Last (or only) part of a response
+
+READ_CHUNK_SIZE = 64 * 1024  # Large read responses are streamed in frames of this size
+MAX_REQUEST_SIZE = 1024      # Commands are short, anything longer is a broken client
+
+
+def encode_frame(kind, request_id, payload=b""):
+    return HEADER.pack(MAGIC, kind, request_id, len(payload)) + payload
+
+
+def decode_header(header):
+    magic, kind, request_id, length = HEADER.unpack(header)
+    if magic != MAGIC:
+        raise ValueError("Bad frame header")
+    return kind, request_id, length
+
+
+def response_frames(request_id, data, chunk_size=READ_CHUNK_SIZE):
+    # memoryview slices, so a large snapshot is not copied once more per chunk
+    view = memoryview(data)
+    while len(view) > chunk_size:
+        yield encode_frame(CHUNK, request_id, view[:chunk_size])
+        view = view[chunk_size:]
+    yield encode_frame(END, request_id, view)
+
+
+def recv_exactly(sock, size):
+    # None on a clean EOF before the first byte, ConnectionError when the peer goes away mid-message
+    buffer = bytearray()
+    while len(buffer) < size:
+        chunk = sock.recv(size - len(buffer))
+        if not chunk:
+            if buffer:
+                raise ConnectionError("Connection closed in the middle of a frame")
+            return None
+        buffer += chunk
+    return bytes(buffer)
+
+
+def read_frame(sock, max_size=None):
+    # Blocking read of one frame, returns (kind, request_id, payload) or None when the connection closed
+    header = recv_exactly(sock, HEADER.size)
+    if header is None:
+        return None
+    kind, request_id, length = decode_header(header)
+    if max_size is not None and length > max_size:
+        raise ValueError("Frame too large")
+    payload = recv_exactly(sock, length) if length else b""
+    if payload is None:
+        raise ConnectionError("Connection closed in the middle of a frame")
+    return kind, request_id, payload
+
+
+async def read_frame_async(reader, max_size=None, header=b""):
+    # read_frame for asyncio streams. header: bytes of the next header already taken off the stream.
+    if not header:
+        header = await reader.read(HEADER.size)
+        if not header:
+            return None
+    header += await reader.readexactly(HEADER.size - len(header))
+    kind, request_id, length = decode_header(header)
+    if max_size is not None and length > max_size:
+        raise ValueError("Frame too large")
+    return kind, request_id, await reader.readexactly(length)
@@ -1,27 +1,260 @@
+import asyncio
+import queue
 import socket
 import threading
 import time
 import random
+import os
+from concurrent.futures import Future
+from contextlib import contextmanager, nullcontext
 
-file_lock = threading.Lock()
-write_in_progress = threading.Event()
+from protocol import END, MAGIC, MAX_REQUEST_SIZE, REQUEST, encode_frame, read_frame, read_frame_async, response_frames
 
 FILE_PATH = "shared_file.txt"
+PREFER_WRITERS = os.getenv("PREFER_WRITERS", "1") == "1"
+# Simulated write duration in seconds, "1-2" picks a random whole number in that range like before, "0" disables it
+WRITE_DELAY = os.getenv("WRITE_DELAY", "1-2")
+BACKLOG = int(os.getenv("TCP_BACKLOG", str(socket.SOMAXCONN)))
+SERVER_MODE = os.getenv("SERVER_MODE", "threads")  # threads: one thread per connection, asyncio: one event loop
+# none: appends go to the OS page cache, batch: one fsync per group commit, write: an fsync after every record
+DURABILITY = os.getenv("DURABILITY", "batch")
+GROUP_COMMIT_WINDOW = float(os.getenv("GROUP_COMMIT_WINDOW", "0.002"))  # Seconds the commit thread waits for more writes
+GROUP_COMMIT_MAX = int(os.getenv("GROUP_COMMIT_MAX", "256"))  # Most records appended in one batch
+VERBOSE = os.getenv("TCP_VERBOSE", "1") == "1"  # Log every accepted connection
+PIPELINE_DEPTH = int(os.getenv("PIPELINE_DEPTH", "32"))  # Framed requests one connection may have in flight (asyncio mode)
+
+GOODBYE = b"Goodbye!"
+WRITE_DONE = b"Write operation completed successfully."
+WRITE_FAILED = b"Write operation failed."
+UNKNOWN_COMMAND = b"Unknown command. Use 'read', 'write', or 'exit'."
+
+
+def write_delay(value):
+    low, _, high = value.partition('-')
+    if high:
+        return random.randint(int(low), int(high))
+    return float(low)
+
+
+class ReadWriteLock:
+    # Any number of readers or a single writer. With prefer_writers a waiting writer stops new
+    # readers from getting in, so a steady stream of reads cannot starve writes.
+    def __init__(self, prefer_writers=PREFER_WRITERS):
+        self.prefer_writers = prefer_writers
+        self.condition = threading.Condition()
+        self.readers = 0
+        self.writer = False
+        self.waiting_writers = 0
+
+    def acquire_read(self):
+        with self.condition:
+            while self.writer or (self.prefer_writers and self.waiting_writers):
+                self.condition.wait()
+            self.readers += 1
+
+    def release_read(self):
+        with self.condition:
+            self.readers -= 1
+            if self.readers == 0:
+                self.condition.notify_all()
+
+    def acquire_write(self):
+        with self.condition:
+            self.waiting_writers += 1
+            try:
+                while self.writer or self.readers:
+                    self.condition.wait()
+            finally:
+                self.waiting_writers -= 1
+            self.writer = True
+
+    def release_write(self):
+        with self.condition:
+            self.writer = False
+            self.condition.notify_all()
+
+    @contextmanager
+    def read_locked(self):
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write_locked(self):
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+
+class GroupCommitWriter:
+    # The only thread that appends to the file. Writers queue a record and get a Future; the thread takes
+    # everything queued within the window, appends it with one write (plus the fsync durability asks for)
+    # and only then resolves the Futures of the whole batch. N concurrent writes cost one append, not N.
+    def __init__(self, file_path, durability=DURABILITY, window=GROUP_COMMIT_WINDOW, max_batch=GROUP_COMMIT_MAX,
+                 write_delay=WRITE_DELAY, locked=nullcontext, on_commit=None, on_rollback=None):
+        if durability not in ("none", "batch", "write"):
+            raise ValueError(f"Unknown durability {durability!r}, use none, batch or write")
+        self.file_path = file_path
+        self.durability = durability
+        self.window = window
+        self.max_batch = max_batch
+        self.write_delay = write_delay
+        self.locked = locked  # Held only while the snapshot is swapped (on_commit, on_rollback), not during the append
+        self.on_commit = on_commit
+        self.on_rollback = on_rollback  # Called after a failed batch has been cut back out of the file
+        self.queue = queue.Queue()
+        self.file = None  # Opened on the first batch and kept open, not once per write
+        threading.Thread(target=self.run, name="group-commit", daemon=True).start()
+
+    def submit(self, record):
+        future = Future()
+        self.queue.put((record, future))
+        return future
+
+    def next_batch(self):
+        batch = [self.queue.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def run(self):
+        while True:
+            batch = self.next_batch()
+            try:
+                self.commit([record for record, _ in batch])
+            except Exception as e:
+                # Only this batch's writers see the error, the thread goes on with the next batch
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for _, future in batch:
+                future.set_result(None)
+
+    def commit(self, records):
+        # The simulated slow write is paid once per batch
+        time.sleep(write_delay(self.write_delay))
+        if self.file is None:
+            self.file = open(self.file_path, 'ab')
+        size = os.fstat(self.file.fileno()).st_size
+        try:
+            self.append(records)
+            if self.on_commit:
+                with self.locked():
+                    self.on_commit(b"".join(records))
+        except Exception:
+            self.rollback(size)
+            raise
+
+    def rollback(self, size):
+        # A failed batch may be partly in the file (durability=write, or written but not fsynced).
+        # Cut it back to the size before the batch, so a client that retries does not add the record twice,
+        # and reopen on the next batch, the old handle may still buffer bytes of this one.
+        file, self.file = self.file, None
+        try:
+            file.close()
+        except OSError:
+            pass
+        try:
+            os.truncate(self.file_path, size)
+        except OSError:
+            pass  # on_rollback rereads whatever the file now holds
+        if self.on_rollback:
+            with self.locked():
+                self.on_rollback()
+
+    def append(self, records):
+        if self.durability == "write":
+            for record in records:
+                self.file.write(record)
+                self.file.flush()
+                os.fsync(self.file.fileno())
+            return
+        self.file.write(b"".join(records))
+        self.file.flush()
+        if self.durability == "batch":
+            os.fsync(self.file.fileno())
+
+
+class SharedFile:
+    # The file both server modes serve. snapshot is (buffer, length): its contents are buffer[:length], None when
+    # it does not exist yet. Reads are served from it and only a committed write replaces it, so reads never touch the disk.
+    def __init__(self, file_path=FILE_PATH, write_delay=WRITE_DELAY, durability=DURABILITY, locked=nullcontext):
+        self.file_path = file_path
+        self.snapshot = self.load_snapshot()
+        self.writer = GroupCommitWriter(file_path, durability, write_delay=write_delay, locked=locked,
+                                        on_commit=self.publish, on_rollback=self.reload)
+
+    def load_snapshot(self):
+        try:
+            with open(self.file_path, 'rb') as file:
+                data = file.read()
+        except FileNotFoundError:
+            return None
+        return bytearray(data), len(data)
+
+    def submit_record(self):
+        # Future that resolves once the record is in the file
+        return self.writer.submit(f"Data written at {time.ctime()} by {threading.current_thread().name}\n".encode('utf-8'))
+
+    def append_record(self):
+        self.submit_record().result()
+
+    def publish(self, data):
+        # The commit thread knows exactly what changed, the new snapshot needs no reread of the file.
+        # New data goes into the spare room after length, bytes a reader may still be sending never change.
+        # A full buffer is replaced by one twice the size, so a commit copies its own data, not the whole file.
+        buffer, length = self.snapshot or (bytearray(), 0)
+        end = length + len(data)
+        if end > len(buffer):
+            grown = bytearray(max(end, 2 * len(buffer)))
+            grown[:length] = memoryview(buffer)[:length]
+            buffer = grown
+        buffer[length:end] = data
+        self.snapshot = (buffer, end)
+
+    def reload(self):
+        # After a failed batch the file, not the last published snapshot, is what reads must show
+        self.snapshot = self.load_snapshot()
+
+    def read_response(self):
+        if self.snapshot is None:
+            return b"File not found. No data to read."
+        buffer, length = self.snapshot
+        return memoryview(buffer)[:length].toreadonly()
+
 
 class TCPServer:
-    def __init__(self, host='127.0.0.1', port=65432):
+    def __init__(self, host='127.0.0.1', port=65432, file_path=FILE_PATH, prefer_writers=PREFER_WRITERS, backlog=BACKLOG,
+                 write_delay=WRITE_DELAY, verbose=VERBOSE):
         self.host = host
         self.port = port
+        self.verbose = verbose
+        self.lock = ReadWriteLock(prefer_writers)
+        # The commit thread takes the write side only to swap in a new snapshot. The simulated write delay,
+        # the append and the fsync happen outside it, so reads are not held up for the length of a write.
+        self.shared_file = SharedFile(file_path, write_delay, locked=self.lock.write_locked)
         self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         self.server_socket.bind((self.host, self.port))
-        self.server_socket.listen(5)
-        print(f"Server listening on {self.host}:{self.port}")
+        self.server_socket.listen(backlog)
+        if self.verbose:
+            print(f"Server listening on {self.host}:{self.port}")
 
     def start(self):
         try:
             while True:
                 client_socket, client_address = self.server_socket.accept()
-                print(f"Accepted connection from {client_address}")
+                if self.verbose:
+                    print(f"Accepted connection from {client_address}")
                 client_handler = threading.Thread(target=self.handle_client, args=(client_socket,))
                 client_handler.start()
         except KeyboardInterrupt:
@@ -31,41 +264,174 @@ class TCPServer:
 
     def handle_client(self, client_socket):
         with client_socket:
+            try:
+                # The first byte tells a framed client from one speaking the old text protocol
+                if client_socket.recv(1, socket.MSG_PEEK) == MAGIC:
+                    self.handle_framed(client_socket)
+                else:
+                    self.handle_text(client_socket)
+            except (ConnectionError, ValueError):
+                pass  # Client went away or sent a malformed frame
+
+    def handle_text(self, client_socket):
+        while True:
+            message = client_socket.recv(1024).decode('utf-8')
+            if not message:
+                break  # Client closed the connection
+            command = message.strip().lower()
+            client_socket.sendall(self.run_command(command))
+            if command == "exit":
+                break
+
+    def handle_framed(self, client_socket):
+        # Requests are answered in the order they arrive. The client does not have to wait for
+        # one answer before sending the next command, which saves a round trip per command.
+        while True:
+            frame = read_frame(client_socket, MAX_REQUEST_SIZE)
+            if frame is None:
+                break
+            kind, request_id, payload = frame
+            if kind != REQUEST:
+                break
+            command = payload.decode('utf-8').strip().lower()
+            for response_frame in response_frames(request_id, self.run_command(command)):
+                client_socket.sendall(response_frame)
+            if command == "exit":
+                break
+
+    def run_command(self, command):
+        if command == "read":
+            # Waits only while a new snapshot is being swapped in, not for the write behind it,
+            # and holds the lock only to pick up the snapshot, not while sending it
+            with self.lock.read_locked():
+                return self.shared_file.read_response()
+        if command == "write":
+            try:
+                self.shared_file.append_record()
+            except Exception:
+                return WRITE_FAILED
+            return WRITE_DONE
+        if command == "exit":
+            return GOODBYE
+        return UNKNOWN_COMMAND
+
+
+class AsyncTCPServer:
+    # Same protocol on a single asyncio event loop: a connection costs a coroutine and a socket instead of a thread.
+    # The blocking file append happens on the group commit thread, a write just awaits its Future.
+    def __init__(self, host='127.0.0.1', port=65432, file_path=FILE_PATH, backlog=BACKLOG, write_delay=WRITE_DELAY,
+                 verbose=VERBOSE):
+        self.host = host
+        self.port = port
+        self.backlog = backlog
+        self.verbose = verbose
+        self.shared_file = SharedFile(file_path, write_delay)
+
+    def start(self):
+        try:
+            asyncio.run(self.serve())
+        except KeyboardInterrupt:
+            print("Shutting down the server.")
+
+    async def serve(self):
+        server = await asyncio.start_server(self.handle_client, self.host, self.port, backlog=self.backlog, reuse_address=True)
+        if self.verbose:
+            print(f"Server listening on {self.host}:{self.port} (asyncio)")
+        async with server:
+            await server.serve_forever()
+
+    async def handle_client(self, reader, writer):
+        if self.verbose:
+            print(f"Accepted connection from {writer.get_extra_info('peername')}")
+        try:
+            first = await reader.read(1)
+            if first == MAGIC:
+                await self.handle_framed(reader, writer, first)
+            elif first:
+                await self.handle_text(reader, writer, first)
+        except (ConnectionError, ValueError, asyncio.IncompleteReadError):
+            pass  # Client went away or sent a malformed frame
+        finally:
+            writer.close()
+
+    async def handle_text(self, reader, writer, first):
+        message = (first + await reader.read(1023)).decode('utf-8')
+        while message:
+            command = message.strip().lower()
+            writer.write(await self.run_command(command))
+            await writer.drain()
+            if command == "exit":
+                break
+            message = (await reader.read(1024)).decode('utf-8')
+
+    async def handle_framed(self, reader, writer, first):
+        # Every request runs as its own task, so writes sent back to back land in the same group commit and
+        # commands that do not touch the file are answered while a write is pending. A read still waits for
+        # the writes sent before it on this connection, so the client always reads its own writes.
+        # Responses may come back out of order, the request id on each frame says which command they belong to.
+        # writer.write is synchronous, so frames of different responses interleave but never split.
+        in_flight = asyncio.Semaphore(PIPELINE_DEPTH)
+        tasks = set()
+        last_write = None
+        header = first
+        try:
             while True:
-                message = client_socket.recv(1024).decode('utf-8')
-                command = message.strip().lower()
-
-                if command == "read":
-                    self.handle_read(client_socket)
-                elif command == "write":
-                    self.handle_write(client_socket)
-                elif command == "exit":
-                    client_socket.sendall(b"Goodbye!")
+                frame = await read_frame_async(reader, MAX_REQUEST_SIZE, header)
+                header = b""
+                if frame is None:
                     break
-                else:
-                    client_socket.sendall(b"Unknown command. Use 'read', 'write', or 'exit'.")
+                kind, request_id, payload = frame
+                if kind != REQUEST:
+                    break
+                command = payload.decode('utf-8').strip().lower()
+                if command == "exit":
+                    # Answer everything sent before the exit first
+                    await asyncio.gather(*tasks)
+                    writer.write(encode_frame(END, request_id, GOODBYE))
+                    await writer.drain()
+                    break
+                await in_flight.acquire()  # Stop reading new requests while the client has too many open
+                after = last_write if command == "read" else None
+                task = asyncio.create_task(self.answer(writer, request_id, command, in_flight, after))
+                if command == "write":
+                    last_write = task
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def answer(self, writer, request_id, command, in_flight, after=None):
+        try:
+            if after is not None:
+                await asyncio.wait([after])
+            for response_frame in response_frames(request_id, await self.run_command(command)):
+                writer.write(response_frame)
+                await writer.drain()
+        finally:
+            in_flight.release()
 
-    def handle_read(self, client_socket):
-        if write_in_progress.is_set():
-            client_socket.sendall(b"Write operation in progress. Please try again later.")
-        else:
+    async def run_command(self, command):
+        if command == "read":
+            # The commit thread swaps in a whole new snapshot, a read sees the old one or the new one, never half
+            return self.shared_file.read_response()
+        if command == "write":
             try:
-                with open(FILE_PATH, 'r') as file:
-                    data = file.read()
-                    client_socket.sendall(data.encode('utf-8'))
-            except FileNotFoundError:
-                client_socket.sendall(b"File not found. No data to read.")
-
-    def handle_write(self, client_socket):
-        write_in_progress.set()
-        with file_lock:
-            time.sleep(random.randint(1, 2))
-            data_to_write = f"Data written at {time.ctime()} by {threading.current_thread().name}\n"
-            with open(FILE_PATH, 'a') as file:
-                file.write(data_to_write)
-            client_socket.sendall(b"Write operation completed successfully.")
-        write_in_progress.clear()
+                await asyncio.wrap_future(self.shared_file.submit_record())
+            except Exception:
+                return WRITE_FAILED
+            return WRITE_DONE
+        if command == "exit":
+            return GOODBYE
+        return UNKNOWN_COMMAND
+
+
+SERVERS = {
+    "threads": TCPServer,
+    "asyncio": AsyncTCPServer
+}
 
 if __name__ == "__main__":
-    server = TCPServer()
-    server.start()
\ No newline at end of file
+    server = SERVERS[SERVER_MODE]()
+    server.start()
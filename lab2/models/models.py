@@ -1,5 +1,6 @@
-from sqlalchemy import Column, Integer, String, Float, UniqueConstraint
-from sqlalchemy.orm import declarative_base
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Index, UniqueConstraint
+from sqlalchemy.orm import declarative_base, relationship
+from datetime import datetime
 
 Base = declarative_base()
 
@@ -11,7 +12,26 @@ class Book(Base):
     author = Column(String, nullable=False)
     price = Column(Float, nullable=False)
     file_path = Column(String, nullable=True)  # For storing the uploaded file path
+    file_metadata = relationship("FileMetadata", back_populates="book", uselist=False, cascade="all, delete-orphan")
 
     __table_args__ = (
         UniqueConstraint('name', 'author', name='unique_book'),
+        # Price range filters and price sorting, id last so keyset pages seek on (price, id)
+        Index('ix_books_price_id', 'price', 'id'),
+        # Equality on author, rows come back already in id order
+        Index('ix_books_author_id', 'author', 'id'),
+        # LIKE 'prefix%' on name; text_pattern_ops makes it usable under any collation on Postgres
+        Index('ix_books_name_pattern', 'name', postgresql_ops={'name': 'text_pattern_ops'}),
+        # sort=name: ORDER BY and the keyset seek on (name, id) use the default collation, which the pattern index cannot
+        Index('ix_books_name_id', 'name', 'id'),
     )
+
+class FileMetadata(Base):
+    __tablename__ = 'file_metadata'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    filename = Column(String, unique=True, nullable=False)
+    upload_time = Column(DateTime, default=datetime.utcnow, nullable=False)
+    file_size = Column(Integer, nullable=False)
+    book_id = Column(Integer, ForeignKey('books.id'), nullable=False, index=True)  # Joins from books look rows up by book_id
+    book = relationship("Book", back_populates="file_metadata")
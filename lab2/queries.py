@@ -0,0 +1,237 @@
+import base64
+import csv
+import io
+import json
+
+from sqlalchemy import literal_column, select, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import joinedload
+from werkzeug.utils import secure_filename
+from models.models import Book, FileMetadata
+
+# Statements and row helpers shared by the Flask app (app.py) and the ASGI app (asgi.py).
+# Nothing here touches a session: the sync side runs the statements with Session.execute,
+# the async side with AsyncSession.execute.
+
+BULK_CHUNK_SIZE = 1000  # Rows per INSERT statement, all chunks share one transaction
+EXPORT_BATCH_SIZE = 1000  # Rows fetched from the server-side cursor per round-trip
+EXPORT_COLUMNS = ('id', 'name', 'author', 'price', 'file_path')
+SORT_COLUMNS = {'id': Book.id, 'name': Book.name, 'author': Book.author, 'price': Book.price}
+
+
+def book_to_dict(book, include_files=False):
+    result = {
+        "id": book.id,
+        "name": book.name,
+        "author": book.author,
+        "price": book.price,
+        "file_path": book.file_path
+    }
+    if include_files:
+        result["file_metadata"] = file_metadata_to_dict(book.file_metadata) if book.file_metadata else None
+    return result
+
+def new_file_metadata(book_id, upload_filename, file_size):
+    # Stored files are shared by content, so the row's unique filename is made per book: "<book id>_<upload name>"
+    return FileMetadata(book_id=book_id, filename=f"{book_id}_{secure_filename(upload_filename or '') or 'upload'}",
+                        file_size=file_size)
+
+def file_metadata_to_dict(file_metadata):
+    return {
+        "filename": file_metadata.filename,
+        "upload_time": file_metadata.upload_time.isoformat(),
+        "file_size": file_metadata.file_size
+    }
+
+# "price" sorts ascending, "-price" descending, ties are broken by id
+def parse_sort(sort):
+    column = sort.lstrip('-')
+    if column not in SORT_COLUMNS:
+        raise ValueError("Sort must be one of: " + ", ".join(SORT_COLUMNS) + " (prefix with - for descending)")
+    return column, sort.startswith('-')
+
+# Opaque cursor for keyset pagination: the last id the client has seen,
+# plus the sort column value of that row when sorting by something other than id
+def encode_cursor(last_id, sort='id', value=None):
+    cursor = {"id": last_id}
+    if parse_sort(sort)[0] != 'id':
+        cursor.update(sort=sort, value=value)
+    return base64.urlsafe_b64encode(json.dumps(cursor).encode()).decode()
+
+def decode_cursor(cursor, sort='id'):
+    try:
+        cursor = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if parse_sort(sort)[0] == 'id':
+            return int(cursor["id"]), None
+        if cursor["sort"] != sort:
+            raise ValueError("Cursor belongs to another sort order")
+        return int(cursor["id"]), cursor["value"]
+    except (ValueError, KeyError, TypeError):
+        raise ValueError("Invalid cursor")
+
+def next_cursor(books, limit, sort):
+    # A full page may have more rows after it, a short one is the last
+    if not books or len(books) < limit:
+        return None
+    return encode_cursor(books[-1].id, sort, getattr(books[-1], parse_sort(sort)[0]))
+
+def escape_like(value):
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+def filter_books(statement, filters):
+    # Each filter is served by an index from models.Book (see database.create_tables)
+    if filters.get('author'):
+        statement = statement.filter(Book.author == filters['author'])
+    if filters.get('name_prefix'):
+        # A left-anchored LIKE can use the text_pattern_ops index on name, a substring match could not
+        statement = statement.filter(Book.name.like(escape_like(filters['name_prefix']) + '%', escape='\\'))
+    if filters.get('min_price') is not None:
+        statement = statement.filter(Book.price >= filters['min_price'])
+    if filters.get('max_price') is not None:
+        statement = statement.filter(Book.price <= filters['max_price'])
+    return statement
+
+def sorted_books(filters, sort, include_files=False):
+    column, descending = parse_sort(sort)
+    keys = [Book.id] if column == 'id' else [SORT_COLUMNS[column], Book.id]
+    statement = filter_books(select(Book), filters or {})
+    if include_files:
+        # One LEFT OUTER JOIN instead of one file_metadata query per book on the page
+        statement = statement.options(joinedload(Book.file_metadata))
+    return statement.order_by(*[key.desc() if descending else key for key in keys])
+
+def offset_statement(offset, limit, filters=None, sort='id', include_files=False):
+    return sorted_books(filters, sort, include_files).offset(offset).limit(limit)
+
+def parse_price_filter(value, name):
+    # None when the parameter is absent, ValueError when it is not a number
+    if value is None or value == '':
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        raise ValueError(f"{name} must be a valid number")
+
+def keyset_statement(after_id, limit, filters=None, sort='id', after_value=None, include_files=False):
+    # Seek past the last row seen, the database jumps straight to the page instead of skipping offset rows.
+    # For other sort columns the seek is a row comparison on (column, id), which the composite indexes serve.
+    statement = sorted_books(filters, sort, include_files)
+    if after_id is not None:
+        column, descending = parse_sort(sort)
+        if column == 'id':
+            key, bound = Book.id, after_id
+        else:
+            key, bound = tuple_(SORT_COLUMNS[column], Book.id), tuple_(after_value, after_id)
+        statement = statement.filter(key < bound if descending else key > bound)
+    return statement.limit(limit)
+
+def validate_book_row(row):
+    # Returns (values, error) for one bulk row, same rules as the form endpoint
+    if not isinstance(row, dict):
+        return None, "Row must be a JSON object"
+    for field in ('name', 'author', 'price'):
+        if row.get(field) in (None, ''):
+            return None, f"Missing required field: {field}"
+    try:
+        price = float(row['price'])
+    except (TypeError, ValueError):
+        return None, "Price must be a valid number"
+    return {"name": str(row['name']), "author": str(row['author']), "price": price}, None
+
+def parse_ndjson(lines):
+    rows = []
+    for line in lines:
+        line = line.strip()
+        if line:
+            try:
+                rows.append(json.loads(line))
+            except ValueError:
+                rows.append(None)
+    return rows
+
+def plan_bulk(rows):
+    # One pass: validate every row and keep only the first occurrence of each (name, author).
+    # Returns the per-row results so far and {(name, author): (index, values)} still to be written.
+    results = [None] * len(rows)
+    to_write = {}
+    for index, row in enumerate(rows):
+        values, error = validate_book_row(row)
+        if error:
+            results[index] = {"index": index, "status": "invalid", "error": error}
+        elif (values['name'], values['author']) in to_write:
+            results[index] = {"index": index, "status": "duplicate"}
+        else:
+            to_write[(values['name'], values['author'])] = (index, values)
+    return results, to_write
+
+def bulk_chunks(to_write):
+    pending = list(to_write.values())
+    for start in range(0, len(pending), BULK_CHUNK_SIZE):
+        yield [values for _, values in pending[start:start + BULK_CHUNK_SIZE]]
+
+def upsert_statement(dialect, rows, update_existing):
+    # INSERT ... ON CONFLICT (name, author) against the unique_book constraint.
+    # Conflicting rows are skipped, or get their price updated when update_existing is set.
+    insert = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+    statement = insert(Book).values(rows)
+    if update_existing:
+        statement = statement.on_conflict_do_update(index_elements=['name', 'author'], set_={'price': statement.excluded.price})
+    else:
+        statement = statement.on_conflict_do_nothing(index_elements=['name', 'author'])
+
+    columns = [Book.id, Book.name, Book.author]
+    if dialect == 'postgresql':
+        # xmax is 0 only for rows this statement inserted, so updates can be told apart
+        columns.append(literal_column('xmax = 0').label('inserted'))
+    return statement.returning(*columns)
+
+def record_written(results, to_write, written_rows, update_existing):
+    for written in written_rows:
+        index, _ = to_write[(written.name, written.author)]
+        if not update_existing:
+            status = "created"
+        elif 'inserted' in written._fields:
+            status = "created" if written.inserted else "updated"
+        else:
+            status = "upserted"  # Dialects without xmax cannot tell inserts from updates
+        results[index] = {"index": index, "status": status, "id": written.id}
+
+def finish_bulk(results, to_write):
+    # Rows that came back from neither insert nor update already existed
+    for index, _ in to_write.values():
+        if results[index] is None:
+            results[index] = {"index": index, "status": "exists"}
+
+    summary = {}
+    for result in results:
+        summary[result['status']] = summary.get(result['status'], 0) + 1
+    return {"summary": summary, "results": results}
+
+def written_ids(results):
+    return [result['id'] for result in results if 'id' in result]
+
+def export_statement(batch_size=EXPORT_BATCH_SIZE):
+    # Plain column tuples from a server-side cursor, fetched batch_size rows at a time
+    statement = select(*[getattr(Book, column) for column in EXPORT_COLUMNS]).order_by(Book.id)
+    return statement.execution_options(yield_per=batch_size)
+
+def format_ndjson(rows):
+    return "".join(json.dumps(dict(zip(EXPORT_COLUMNS, row))) + "\n" for row in rows)
+
+def format_csv(rows):
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue()
+
+# format: (first chunk, one chunk per batch of rows, mimetype)
+EXPORT_FORMATS = {
+    'ndjson': ("", format_ndjson, 'application/x-ndjson'),
+    'csv': (format_csv([EXPORT_COLUMNS]), format_csv, 'text/csv')
+}
+
+def export_chunks(batches, export_format):
+    header, format_rows, _ = EXPORT_FORMATS[export_format]
+    if header:
+        yield header
+    for rows in batches:
+        yield format_rows(rows)
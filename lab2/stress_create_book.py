@@ -0,0 +1,72 @@
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Usage: python stress_create_book.py [number_of_threads] [requests_per_thread]
+# Many threads POST the same few books at once: exactly one create per (name, author) must win
+# and the rest must get a 400, with no SELECT issued on the create path.
+# Uses a throwaway SQLite database as a stand-in for Postgres unless DATABASE_URL is already set.
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "stress_create_book.db")
+
+from sqlalchemy import event, func, select
+from app import app
+from database import SessionLocal, engine, create_tables
+from models.models import Book
+
+DISTINCT_BOOKS = 10
+statement_counts = {}
+counts_lock = threading.Lock()
+
+
+def count_statement(conn, cursor, statement, parameters, context, executemany):
+    kind = statement.lstrip().split(None, 1)[0].upper()
+    with counts_lock:
+        statement_counts[kind] = statement_counts.get(kind, 0) + 1
+
+
+def worker(thread_index, request_count):
+    client = app.test_client()
+    statuses = []
+    for i in range(request_count):
+        book = (thread_index + i) % DISTINCT_BOOKS
+        response = client.post("/books", data={"name": f"Book {book}", "author": "Stress", "price": "9.99"})
+        statuses.append(response.status_code)
+    return statuses
+
+
+def main():
+    thread_count = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    request_count = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    engine.echo = False
+    create_tables()
+    event.listen(engine, "before_cursor_execute", count_statement)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=thread_count) as executor:
+        futures = [executor.submit(worker, i, request_count) for i in range(thread_count)]
+        statuses = [status for future in futures for status in future.result()]
+    elapsed = time.perf_counter() - start
+    event.remove(engine, "before_cursor_execute", count_statement)
+
+    with SessionLocal() as db:
+        rows = db.execute(select(Book.name, func.count()).where(Book.author == "Stress").group_by(Book.name)).all()
+
+    created = statuses.count(201)
+    rejected = statuses.count(400)
+    print(f"{len(statuses)} requests from {thread_count} threads in {elapsed:.2f} s")
+    print(f"created: {created}, rejected as duplicate: {rejected}, other: {len(statuses) - created - rejected}")
+    print(f"statements: {statement_counts} ({sum(statement_counts.values()) / len(statuses):.2f} per request)")
+
+    assert created == DISTINCT_BOOKS, "every distinct book is created exactly once"
+    assert all(count == 1 for _, count in rows), "no duplicate rows in the table"
+    assert created + rejected == len(statuses)
+    assert statement_counts.get("SELECT", 0) == 0, "create path should not query before inserting"
+    print("ok")
+
+
+if __name__ == "__main__":
+    main()
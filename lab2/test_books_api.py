@@ -0,0 +1,131 @@
+import io
+import os
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+# Throwaway SQLite database and upload folder, set before the app reads its configuration
+WORK_DIR = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(WORK_DIR, "test_books_api.db")
+os.environ["BOOK_CACHE"] = "off"
+os.chdir(WORK_DIR)
+
+from sqlalchemy import func, select
+from app import app
+from cache import BookCache, MemoryCache
+from database import SessionLocal, create_tables, engine
+from models.models import Book
+
+engine.echo = False
+create_tables()
+
+
+class CreateBookTest(unittest.TestCase):
+    def test_concurrent_duplicates_create_one_book(self):
+        # Many clients post the same books at once: exactly one create per (name, author) wins
+        def post(index):
+            return app.test_client().post("/books", data={"name": f"Race {index % 5}", "author": "Race",
+                                                          "price": "9.99"}).status_code
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            statuses = list(executor.map(post, range(80)))
+
+        self.assertEqual(statuses.count(201), 5)
+        self.assertEqual(statuses.count(400), 75)
+        with SessionLocal() as db:
+            counts = db.execute(select(Book.name, func.count()).where(Book.author == "Race").group_by(Book.name)).all()
+        self.assertEqual(sorted(counts), [(f"Race {n}", 1) for n in range(5)])
+
+    def test_upload_records_file_metadata(self):
+        client = app.test_client()
+        for name in ("Upload A", "Upload B"):  # Same content and file name: one stored file, one row per book
+            response = client.post("/books", data={"name": name, "author": "Upload", "price": "3",
+                                                   "file": (io.BytesIO(b"same bytes"), "cover.txt")})
+            self.assertEqual(response.status_code, 201)
+        books = client.get("/books?author=Upload&include=files").get_json()
+        self.assertEqual([book["file_metadata"]["filename"] for book in books],
+                         [f"{book['id']}_cover.txt" for book in books])
+        self.assertEqual([book["file_metadata"]["file_size"] for book in books], [10, 10])
+        self.assertEqual(books[0]["file_path"], books[1]["file_path"])
+
+    def test_update_with_invalid_price_is_rejected(self):
+        client = app.test_client()
+        book_id = client.post("/books", data={"name": "Update", "author": "Update", "price": "4"}).get_json()["book"]["id"]
+        for price in ("abc", ""):
+            with self.subTest(price=price):
+                response = client.put(f"/books/{book_id}", data={"name": "Renamed", "price": price})
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.get_json()["error"], "Price must be a valid number")
+        self.assertEqual(client.get(f"/books/{book_id}").get_json()["name"], "Update")
+        self.assertEqual(client.put(f"/books/{book_id}", data={"price": "5"}).status_code, 200)
+
+
+class GetBooksTest(unittest.TestCase):
+    def test_invalid_price_filter_is_rejected(self):
+        client = app.test_client()
+        for query in ("min_price=abc", "max_price=abc", "min_price=1&max_price=x", "after=&min_price=abc"):
+            with self.subTest(query=query):
+                response = client.get("/books?" + query)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("must be a valid number", response.get_json()["error"])
+
+    def test_valid_price_filter(self):
+        client = app.test_client()
+        client.post("/books", data={"name": "Cheap", "author": "Filter", "price": "1.5"})
+        client.post("/books", data={"name": "Dear", "author": "Filter", "price": "50"})
+        books = client.get("/books?author=Filter&min_price=1&max_price=10").get_json()
+        self.assertEqual([book["name"] for book in books], ["Cheap"])
+
+
+class BookCacheTest(unittest.TestCase):
+    # The rest of the file runs with BOOK_CACHE=off, here the app gets a fresh in-process cache per test
+    def setUp(self):
+        patcher = mock.patch("app.book_cache", BookCache(MemoryCache()))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = app.test_client()
+
+    def create(self, name, author, price="1"):
+        return self.client.post("/books", data={"name": name, "author": author, "price": price}).get_json()["book"]["id"]
+
+    def names(self, author):
+        return [book["name"] for book in self.client.get(f"/books?author={author}&limit=50").get_json()]
+
+    def test_reads_after_writes_see_new_data(self):
+        book_id = self.create("First", "Cached")
+        self.assertEqual(self.names("Cached"), ["First"])
+        self.assertEqual(self.client.get(f"/books/{book_id}").get_json()["name"], "First")
+
+        self.create("Second", "Cached")
+        self.assertEqual(self.names("Cached"), ["First", "Second"])
+
+        self.client.put(f"/books/{book_id}", data={"name": "Renamed"})
+        self.assertEqual(self.names("Cached"), ["Renamed", "Second"])
+        self.assertEqual(self.client.get(f"/books/{book_id}").get_json()["name"], "Renamed")
+
+        response = self.client.post("/books/bulk?on_conflict=update", json=[
+            {"name": "Renamed", "author": "Cached", "price": 7}, {"name": "Third", "author": "Cached", "price": 1}])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.names("Cached"), ["Renamed", "Second", "Third"])
+        self.assertEqual(self.client.get(f"/books/{book_id}").get_json()["price"], 7)
+
+        self.client.delete(f"/books/{book_id}")
+        self.assertEqual(self.names("Cached"), ["Second", "Third"])
+        self.assertEqual(self.client.get(f"/books/{book_id}").status_code, 404)
+
+    def test_etag_until_write(self):
+        book_id = self.create("Tagged", "ETag")
+        for url in ("/books?author=ETag", f"/books/{book_id}"):
+            with self.subTest(url=url):
+                etag = self.client.get(url).headers["ETag"]
+                self.assertEqual(self.client.get(url, headers={"If-None-Match": etag}).status_code, 304)
+
+                self.client.put(f"/books/{book_id}", data={"price": str(len(url))})
+                response = self.client.get(url, headers={"If-None-Match": etag})
+                self.assertEqual(response.status_code, 200)
+                self.assertNotEqual(response.headers["ETag"], etag)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from message_log import MessageLog
+
+# Usage: python bench_history.py [log_sizes] [history_size]
+#   e.g. python bench_history.py 1000,100000,1000000 50
+# Builds chat logs of growing length and times what a joining client costs: replaying and sending the
+# whole file (the old load_previous_messages) against the last history_size messages from MessageLog.
+# Also times a history_before page from the middle of the log and opening the log with and without an index.
+
+
+def write_log(path, count):
+    with open(path, "w") as f:
+        for n in range(count):
+            f.write(json.dumps({"content": f"message number {n} in the chat log", "sender": 50000 + n % 100}) + "\n")
+
+
+def full_replay(path):
+    with open(path, "r") as f:
+        messages = [json.loads(line.strip()) for line in f.readlines()]
+    return json.dumps({"type": "history", "messages": messages})
+
+
+def best_of(function, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times) * 1000
+
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main():
+    sizes = [int(size) for size in (sys.argv[1] if len(sys.argv) > 1 else "1000,10000,100000,1000000").split(",")]
+    history_size = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    work_dir = tempfile.mkdtemp()
+    print(f"join = last {history_size} messages, times in ms")
+    print(f"{'messages':>10}{'full replay':>13}{'join':>9}{'mid page':>10}{'index build':>13}{'reopen':>9}")
+    try:
+        for size in sizes:
+            path = os.path.join(work_dir, f"chat_{size}.txt")
+            write_log(path, size)
+            replay = best_of(lambda: full_replay(path), 3 if size <= 100000 else 1)
+
+            log, build = timed(lambda: MessageLog(path))  # Indexes the whole pre-existing log once
+            log.close()
+            log, reopen = timed(lambda: MessageLog(path))
+            join = best_of(lambda: json.dumps({"type": "history", "messages": log.last(history_size)}), 20)
+            page = best_of(lambda: json.dumps({"type": "history", "messages": log.history_before(size // 2, history_size)}), 20)
+            log.close()
+            print(f"{size:>10}{replay:>13.2f}{join:>9.3f}{page:>10.3f}{build:>13.1f}{reopen:>9.1f}")
+    finally:
+        shutil.rmtree(work_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,42 +2,75 @@ import asyncio
 import websockets
 import json
 import os
-from threading import Lock
+from message_log import MessageLog
 
-file_lock = Lock()
 shared_file = "shared_chat_data.txt"
+HISTORY_SIZE = int(os.getenv("CHAT_HISTORY_SIZE", "50"))  # Messages a new client gets when it joins
+HISTORY_PAGE_MAX = int(os.getenv("CHAT_HISTORY_PAGE_MAX", "200"))  # Most messages one history_before request returns
+RECENT_SIZE = int(os.getenv("CHAT_RECENT_SIZE", "1000"))  # Newest messages kept in memory
 connected_clients = set()
+message_log = None
 
-def save_message(data):
-    with file_lock:
-        with open(shared_file, "a") as f:
-            f.write(json.dumps(data) + "\n")
+def history_frame(messages):
+    # has_more: older messages can be fetched with {"type": "history_before", "before": messages[0]["id"]}
+    return json.dumps({"type": "history", "messages": messages, "has_more": bool(messages) and messages[0]["id"] > 0})
 
-def load_previous_messages():
-    if not os.path.exists(shared_file):
-        return []
-    with file_lock:
-        with open(shared_file, "r") as f:
-            return [json.loads(line.strip()) for line in f.readlines()]
+def error_frame(message):
+    return json.dumps({"type": "error", "error": message})
+
+def history_request(message_data):
+    # (before, limit) of a history_before request, ValueError when a field is missing or not a number
+    try:
+        before = int(message_data['before'])
+        limit = int(message_data.get('limit', HISTORY_SIZE))
+    except (KeyError, TypeError, ValueError):
+        raise ValueError("history_before needs an integer 'before' and, optionally, an integer 'limit'")
+    if before < 0 or limit < 1:
+        raise ValueError("'before' must be 0 or more and 'limit' 1 or more")
+    return before, min(limit, HISTORY_PAGE_MAX)
 
 async def chat_room_handler(websocket):
     connected_clients.add(websocket)
     try:
-        previous_messages = load_previous_messages()
-        await websocket.send(json.dumps({"type": "history", "messages": previous_messages}))
+        # Only the newest messages, from memory: joining costs the same however long the log is
+        await websocket.send(history_frame(message_log.last(HISTORY_SIZE)))
         async for message in websocket:
-            message_data = json.loads(message)
+            # A bad request gets an error frame back, the connection stays open
+            try:
+                message_data = json.loads(message)
+            except ValueError:
+                message_data = None
+            if not isinstance(message_data, dict):
+                await websocket.send(error_frame("Messages must be JSON objects"))
+                continue
+            if message_data.get('type') == 'history_before':
+                try:
+                    before, limit = history_request(message_data)
+                except ValueError as e:
+                    await websocket.send(error_frame(str(e)))
+                    continue
+                await websocket.send(history_frame(message_log.history_before(before, limit)))
+                continue
             message_data['sender'] = websocket.remote_address[1]
-            save_message(message_data)
-            await asyncio.wait([client.send(json.dumps(message_data)) for client in connected_clients if client != websocket])
+            message_data = message_log.append(message_data)
+            # The sender already shows its message, it only gets the id the log gave it
+            await websocket.send(json.dumps({"type": "ack", "id": message_data['id']}))
+            others = [client.send(json.dumps(message_data)) for client in connected_clients if client != websocket]
+            if others:
+                await asyncio.wait([asyncio.ensure_future(send) for send in others])
     except websockets.exceptions.ConnectionClosed:
         print("A client has disconnected")
     finally:
         connected_clients.remove(websocket)
 
 async def start_websocket_server():
-    async with websockets.serve(chat_room_handler, "localhost", 8765):
-        await asyncio.Future()
+    global message_log
+    message_log = MessageLog(shared_file, RECENT_SIZE)
+    try:
+        async with websockets.serve(chat_room_handler, "localhost", 8765):
+            await asyncio.Future()
+    finally:
+        message_log.close()
 
 if __name__ == "__main__":
     asyncio.run(start_websocket_server())
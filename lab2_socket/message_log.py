@@ -0,0 +1,99 @@
+import json
+import os
+import struct
+from collections import deque
+
+# Append-only chat log: one JSON message per line, as before, plus a sidecar index holding the byte offset
+# where every line starts (8 bytes each), so message n is found with one seek instead of a scan.
+# The newest messages are also kept in memory; a joining client is served from there.
+OFFSET = struct.Struct("!Q")
+
+
+class MessageLog:
+    def __init__(self, path, recent_size=1000):
+        self.path = path
+        self.index_path = path + ".idx"
+        self.recent = deque(maxlen=recent_size)  # Newest messages, each with its "id" (line number) set
+        self.log = open(path, "ab+")
+        self.index = open(self.index_path, "ab+")
+        self.count = self.catch_up_index()
+        self.recent.extend(self.read_range(max(0, self.count - recent_size), self.count))
+
+    def catch_up_index(self):
+        # Indexes whatever the log holds beyond the index: a log written before the index existed,
+        # or lines appended by a process that died before updating the index
+        index_size = os.fstat(self.index.fileno()).st_size
+        log_size = os.fstat(self.log.fileno()).st_size
+        count = index_size // OFFSET.size
+        self.index.truncate(count * OFFSET.size)  # Drop a torn last entry
+        indexed_end = 0
+        if count:
+            last_offset = self.offset(count - 1)
+            if last_offset >= log_size:
+                # The index points past the end of the log, it does not belong to this file
+                self.index.truncate(0)
+                return self.catch_up_index()
+            self.log.seek(last_offset)
+            indexed_end = last_offset + len(self.log.readline())
+
+        self.log.seek(indexed_end)
+        offset = indexed_end
+        offsets = []
+        for line in self.log:
+            if not line.endswith(b"\n"):
+                self.log.truncate(offset)  # A torn last line is not a message, cut it off before appending after it
+                break
+            offsets.append(OFFSET.pack(offset))
+            offset += len(line)
+        if offsets:
+            self.index.seek(0, os.SEEK_END)
+            self.index.write(b"".join(offsets))
+            self.index.flush()
+        self.log.seek(0, os.SEEK_END)
+        return count + len(offsets)
+
+    def offset(self, message_id):
+        self.index.seek(message_id * OFFSET.size)
+        return OFFSET.unpack(self.index.read(OFFSET.size))[0]
+
+    def append(self, message):
+        # Log line first, index entry second: a crash in between leaves a line catch_up_index picks up
+        self.log.seek(0, os.SEEK_END)
+        offset = self.log.tell()
+        self.log.write(json.dumps(message).encode("utf-8") + b"\n")
+        self.log.flush()
+        self.index.seek(0, os.SEEK_END)
+        self.index.write(OFFSET.pack(offset))
+        self.index.flush()
+
+        message = dict(message, id=self.count)
+        self.count += 1
+        self.recent.append(message)
+        return message
+
+    def read_range(self, start, end):
+        # Messages start..end-1 from disk: the lines are contiguous, two index lookups and one read get them all
+        if start >= end:
+            return []
+        start_offset = self.offset(start)
+        end_offset = self.offset(end) if end < self.count else os.fstat(self.log.fileno()).st_size
+        self.log.seek(start_offset)
+        lines = self.log.read(end_offset - start_offset).splitlines()
+        self.log.seek(0, os.SEEK_END)
+        return [dict(json.loads(line), id=message_id) for message_id, line in zip(range(start, end), lines)]
+
+    def history_before(self, before, limit):
+        # Up to limit messages older than id before, oldest first
+        end = min(max(before, 0), self.count)
+        start = max(0, end - limit)
+        first_recent = self.count - len(self.recent)
+        if start >= first_recent:
+            return [self.recent[message_id - first_recent] for message_id in range(start, end)]
+        return self.read_range(start, end)
+
+    def last(self, limit):
+        return self.history_before(self.count, limit)
+
+    def close(self):
+        self.log.close()
+        self.index.close()
@@ -4,13 +4,15 @@ import os
 import requests
 import re
 import json
+from urllib.parse import urljoin
 from bs4 import BeautifulSoup
 
 RABBITMQ_HOST = os.getenv('RABBITMQ_HOST', 'rabbitmq')
+NON_PRICE_CHARS = re.compile(r'[^\d.]')
 
 def clean_book_data(book_data):
     book_data['name'] = book_data['name'].strip()
-    price_str = re.sub(r'[^\d.]', '', book_data['price'])
+    price_str = NON_PRICE_CHARS.sub('', book_data['price'])
     book_data['price'] = float(price_str)
     return book_data
 
@@ -43,6 +45,27 @@ def get_books_info():
         print("Failed to fetch the website content.")
         return []
 
+def iter_books_info(url="http://books.toscrape.com/"):
+    # Follow the "next" links through the whole catalogue and yield books as soon as their page is parsed
+    session = requests.Session()
+    while url:
+        response = session.get(url)
+        if response.status_code != 200:
+            print(f"Failed to fetch {url}: {response.status_code}")
+            return
+        soup = BeautifulSoup(response.text, 'html.parser')
+        for book in soup.find_all('article', class_='product_pod'):
+            book_data = {
+                'name': book.h3.a['title'],
+                'price': book.find('p', class_='price_color').text,
+                'link': urljoin(url, book.h3.a['href']),
+                'author': 'Unknown'  # since original data does not have author info
+            }
+            yield clean_book_data(book_data)
+
+        next_item = soup.find('li', class_='next')
+        url = urljoin(url, next_item.a['href']) if next_item and next_item.a else None
+
 def publish_books_to_rabbitmq(books_info):
     for i in range(10):
         try:
@@ -57,6 +80,7 @@ def publish_books_to_rabbitmq(books_info):
         exit(1)
 
     channel.queue_declare(queue='books_queue', durable=True)
+    # books_info can be a generator, each book is published as soon as it is scraped
     for book in books_info:
         message = json.dumps(book)
         try:
@@ -68,6 +92,9 @@ def publish_books_to_rabbitmq(books_info):
     connection.close()
 
 if __name__ == "__main__":
-    books = get_books_info()
-    if books:
-        publish_books_to_rabbitmq(books)
+    if os.getenv('SCRAPE_ALL_PAGES', '0') == '1':
+        publish_books_to_rabbitmq(iter_books_info())
+    else:
+        books = get_books_info()
+        if books:
+            publish_books_to_rabbitmq(books)
@@ -1,4 +1,6 @@
 from flask import Flask, request, jsonify, send_file
+from sqlalchemy.exc import IntegrityError
+from werkzeug.utils import secure_filename
 from database import SessionLocal, create_tables
 from models.models import Book
 import os
@@ -40,20 +42,6 @@ def create_book():
     except ValueError:
         return jsonify({"error": "Price must be a valid number"}), 400
 
-    # Remove file handling if not needed
-    file = request.files.get('file')
-
-    # Check if book with same name and author exists
-    if db.query(Book).filter_by(name=name, author=author).first():
-        return jsonify({"error": "Book with the same name and author already exists"}), 400
-
-    # Handle the uploaded file if present (if you still want to handle file separately)
-    file_path = None
-    if file:
-        file_path = os.path.join(UPLOAD_FOLDER, file.filename)
-        file.save(file_path)
-
-    # Now, exclude 'file_path' from Book creation since it is no longer needed
     new_book = Book(
         name=name,
         author=author,
@@ -61,7 +49,20 @@ def create_book():
         link=data.get('link', ''),  # If link is provided, else an empty string
     )
 
+    # Duplicates are rejected by the unique_book constraint instead of a SELECT before the INSERT,
+    # so two consumers posting the same book at once cannot both insert it
     db.add(new_book)
+    try:
+        db.flush()
+    except IntegrityError:
+        db.rollback()
+        return jsonify({"error": "Book with the same name and author already exists"}), 400
+
+    # The upload is saved only once the insert went through, so a rejected duplicate leaves no file behind.
+    # The book id in the name keeps two books with an upload of the same name from overwriting each other.
+    file = request.files.get('file')
+    if file and file.filename:
+        file.save(os.path.join(UPLOAD_FOLDER, f"{new_book.id}_{secure_filename(file.filename)}"))
     db.commit()
 
     return jsonify({"message": "Book added successfully", "book": {
@@ -107,7 +108,11 @@ def update_book(book_id):
     book.author = data.get('author', book.author)
     book.price = float(data.get('price', book.price))
 
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        return jsonify({"error": "Book with the same name and author already exists"}), 400
     return jsonify({"message": "Book updated successfully"})
 
 # Delete a book
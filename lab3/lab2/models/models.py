@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, UniqueConstraint
 from sqlalchemy.orm import declarative_base, relationship
 from datetime import datetime
 
@@ -11,4 +11,8 @@ class Book(Base):
     name = Column(String, nullable=False)
     author = Column(String, nullable=False)
     price = Column(Float, nullable=False)
-    link = Column(String, nullable=False)
\ No newline at end of file
+    link = Column(String, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint('name', 'author', name='unique_book'),
+    )